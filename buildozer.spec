@@ -59,7 +59,7 @@ android.theme = @android:style/Theme.DeviceDefault.NoActionBar.Fullscreen
 android.add_jars =
 
 # (list) Python files to include
-source.include_exts = py,png,jpg,kv,atlas
+source.include_exts = py,png,jpg,kv,atlas,ttf
 
 # (list) Assets to include (icons, sounds, fonts, etc.)
 source.include_patterns = assets/*
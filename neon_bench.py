@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# Neon Dash — headless benchmark suite.
+# Runs the real Game update/draw/present path under SDL's dummy video and
+# audio drivers with a fixed seed and scripted input, sweeping scenarios
+# (idle play, dense obstacle waves, particle storms, pause and game-over
+# overlays) across resolutions. Each resolution runs in its own process
+# (the display size is fixed at import), and a cold start per resolution
+# records the time to first frame. Results are written as JSON so runs from
+# different commits can be compared with --compare.
+
+import json, os, platform, subprocess, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DENSE = (50, 200, 500)             # concurrent obstacles (World stress mode)
+STORMS = (2000, 10000, 40000)      # approximate live particles
+SCENARIOS = ["idle", *(f"dense-{n}" for n in DENSE), *(f"particles-{n}" for n in STORMS),
+             "pause", "game_over", *(f"pipelined-{n}" for n in DENSE)]
+
+# name -> (Game kwargs, scripted events {frame: [(flag, pressed)]}, setup(game), per-frame hook(game, i))
+def _scenarios(nd):
+    def particle_storm(live):
+        def hook(game, i):
+            # Bursts of live/5 every 10 frames hold roughly ``live`` particles (0.4 s mean life)
+            if i % 10 == 0:
+                w = game.world
+                game.particles.emit(w.width * 0.5, w.height * 0.5, live // 5,
+                                    (-300, 300), (-400, -40), (0.2, 0.6), nd.NEON_CYAN)
+        return hook
+    def enlarge_pool(capacity):
+        def setup(game):
+            game.particles = nd.ParticleSystem(capacity)
+        return setup
+    def end_run(game):
+        game.world.game_over = True
+    out = {"idle": ({}, {}, None, None)}
+    for n in DENSE:
+        out[f"dense-{n}"] = ({"stress": n}, {}, None, None)
+    for n in STORMS:
+        out[f"particles-{n}"] = ({}, {}, enlarge_pool(n * 2), particle_storm(n))
+    out["pause"] = ({}, {1: [("pause", True)]}, None, None)
+    out["game_over"] = ({}, {}, end_run, None)
+    for n in DENSE:
+        out[f"pipelined-{n}"] = ({"stress": n, "pipeline": True}, {}, None, None)
+    return out
+
+def _scripted_input_class(nd):
+    class ScriptedInput(nd.Input):
+        """Input that replays ``script`` ({frame: [(flag, pressed)]}) instead of SDL events."""
+        def __init__(self, script):
+            super().__init__()
+            self.script = script
+            self.frame = 0
+        def poll(self):
+            self.clear_edges()
+            for flag, pressed in self.script.get(self.frame, ()):
+                if flag == "jump":
+                    self.press_jump() if pressed else self.release_jump()
+                elif flag in ("left", "right", "down"):
+                    setattr(self, flag, pressed)
+                else:
+                    setattr(self, flag + "_pressed", pressed)
+            self.frame += 1
+    return ScriptedInput
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+def run_scenarios(names, frames, warmup, seed, dt=1/120):
+    """Run scenarios in this process (display sized by NEON_DASH_SIZE); returns result dicts."""
+    import neon_dash as nd
+    scenarios = _scenarios(nd)
+    ScriptedInput = _scripted_input_class(nd)
+    results = []
+    for name in names:
+        kwargs, script, setup, hook = scenarios[name]
+        game = nd.Game(seed=seed, **kwargs)
+        game.inp = ScriptedInput(script)
+        if setup: setup(game)
+        times = []
+        for i in range(warmup + frames):
+            if hook: hook(game, i)
+            t = time.perf_counter()
+            game.frame(dt)
+            if i >= warmup:
+                times.append((time.perf_counter() - t) * 1000.0)
+        if game.pipeline:
+            game.pipeline.close()
+        total = sum(times)
+        times.sort()
+        phases = {k: round(v[0], 4) for k, v in game.profiler.summary().items()}
+        results.append({
+            "scenario": name,
+            "size": f"{nd.WIDTH}x{nd.HEIGHT}",
+            "frames": frames,
+            "fps": round(frames / (total / 1000.0), 2),
+            "mean_ms": round(total / frames, 4),
+            "p50_ms": round(_percentile(times, 0.50), 4),
+            "p95_ms": round(_percentile(times, 0.95), 4),
+            "p99_ms": round(_percentile(times, 0.99), 4),
+            "max_ms": round(times[-1], 4),
+            "phase_p50_ms": phases,
+            "entities": {"obstacles": len(game.world.obstacles), "particles": len(game.particles)},
+        })
+        if game.pipeline:
+            results[-1]["pipeline"] = game.pipeline.report()
+    return results
+
+def _meta():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+    return {"commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "pygame": pygame.version.ver,
+            "numpy": numpy_version, "machine": platform.machine(), "platform": platform.platform()}
+
+def measure_startup(env):
+    """Cold-start neon_dash.py once; returns (time to first frame, whole process) in ms."""
+    t = time.perf_counter()
+    out = subprocess.run([sys.executable, os.path.join(HERE, "neon_dash.py"), "--startup",
+                          "--render-scale", "1"], env=env, capture_output=True, text=True, check=True)
+    process_ms = (time.perf_counter() - t) * 1000.0
+    ttff = next(line for line in out.stdout.splitlines() if line.startswith("time to first frame"))
+    return float(ttff.split(":")[1].split()[0]), process_ms
+
+def run_suite(sizes, names, frames, warmup, seed):
+    """Run every size in a fresh worker process; returns the full report dict."""
+    results, startup = [], []
+    for size in sizes:
+        env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+                   NEON_DASH_SIZE=size, PYGAME_HIDE_SUPPORT_PROMPT="1")
+        ttff, process_ms = measure_startup(env)
+        startup.append({"size": size, "ttff_ms": round(ttff, 2), "process_ms": round(process_ms, 2)})
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker",
+               "--frames", str(frames), "--warmup", str(warmup), "--seed", str(seed),
+               "--scenarios", ",".join(names)]
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+        results.extend(json.loads(out.stdout.strip().splitlines()[-1]))
+    meta = _meta()
+    meta.update(frames=frames, warmup=warmup, seed=seed)
+    return {"meta": meta, "results": results, "startup": startup}
+
+def compare(base, new):
+    """Text table of fps/p99 changes between two reports, matched by scenario and size."""
+    old = {(r["scenario"], r["size"]): r for r in base["results"]}
+    lines = [f"{'scenario':<16}{'size':>11}{'fps':>10}{'Δfps':>9}{'p99 ms':>9}{'Δp99':>9}"]
+    for r in new["results"]:
+        o = old.get((r["scenario"], r["size"]))
+        dfps = f"{(r['fps'] / o['fps'] - 1) * 100:+.1f}%" if o else "new"
+        dp99 = f"{(r['p99_ms'] / o['p99_ms'] - 1) * 100:+.1f}%" if o else ""
+        lines.append(f"{r['scenario']:<16}{r['size']:>11}{r['fps']:>10.1f}{dfps:>9}{r['p99_ms']:>9.2f}{dp99:>9}")
+    old = {r["size"]: r for r in base.get("startup", ())}
+    for r in new.get("startup", ()):
+        o = old.get(r["size"])
+        d = f"{(r['ttff_ms'] / o['ttff_ms'] - 1) * 100:+.1f}%" if o else "new"
+        lines.append(f"{'first frame ms':<16}{r['size']:>11}{r['ttff_ms']:>10.1f}{d:>9}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Headless Neon Dash benchmarks.")
+    ap.add_argument("--sizes", default="1280x720,1920x1080,3840x2160")
+    ap.add_argument("--scenarios", default=None, help="comma-separated subset (default: all)")
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--warmup", type=int, default=60)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    ap.add_argument("--compare", metavar="BASE", help="print changes against an earlier report")
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, HERE)
+        import neon_dash as nd
+        nd.init_audio()     # beeps are part of the measured frame
+        print(json.dumps(run_scenarios(args.scenarios.split(","), args.frames, args.warmup, args.seed)))
+        sys.exit()
+
+    names = args.scenarios.split(",") if args.scenarios else SCENARIOS
+    report = run_suite(args.sizes.split(","), names, args.frames, args.warmup, args.seed)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), report), file=sys.stderr)
@@ -12,14 +12,34 @@ import pathlib
 code = r'''#!/usr/bin/env python3
 # Neon Dash (v2) — tighter controls, buffered jumps, single event loop
 '''
-import math, random, sys, time
+import gc, math, os, random, sys, threading, time, tracemalloc
+STARTED = time.perf_counter()   # time-to-first-frame is measured from here (module load)
+from array import array
+from collections import OrderedDict, namedtuple
 import pygame
+from neon_sim import SIM_DT, SIM_HZ, Controls, InputLog, Pickup, World, replay
 
-pygame.init()
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Only what the first frame needs; the mixer opens on a worker thread (start_audio)
+pygame.display.init()
+pygame.font.init()
 
 info = pygame.display.Info()
 WIDTH, HEIGHT = info.current_w, info.current_h
-FPS = 120
+if os.environ.get("NEON_DASH_SIZE"):
+    # Fixed window size (benchmarks, testing), e.g. NEON_DASH_SIZE=1920x1080
+    WIDTH, HEIGHT = (int(v) for v in os.environ["NEON_DASH_SIZE"].split("x"))
+FPS = 120                  # frame cap in --pace fixed, and when the refresh rate is unknown
+MAX_STEPS = SIM_HZ // 20   # below 20 FPS the game slows down rather than stepping further
+BATTERY_FPS = 60
+IDLE_FPS = 30              # paused and game-over screens
+RENDER_SCALES = (1.0, 0.85, 0.7, 0.6, 0.5)   # steps of the automatic render-scale controller
+LEVEL_RESERVE_MS = 1.0     # frame budget kept free of idle-time level generation
+LEVEL_SLICE_MS = 1.0       # level generation after each pipelined simulation job
 
 # Colors
 BLACK = (10, 10, 18)
@@ -31,504 +51,1502 @@ NEON_YELLOW = (255, 234, 94)
 NEON_GREEN = (50, 255, 170)
 GRAY = (60, 60, 80)
 
-pygame.init()
-try:
-    pygame.mixer.init()
-    SOUND_ON = True
-except Exception:
-    SOUND_ON = False
+# Particle burst sizes (pooled, so these can be large)
+SHIELD_BURST = 300
+PICKUP_BURST = 120
+
+# About one star per 4000 px^2 (120 at minimum, ~2000 at 4K)
+STAR_COUNT = max(120, WIDTH * HEIGHT // 4000)
+
+# Font files loaded by path (no system font scan): a regular face for the HUD
+# and hints and pygame's own bold face for titles
+ASSETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+FONT_FILE = os.path.join(ASSETS, "DejaVuSans.ttf")
+BOLD_FONT_FILE = os.path.join(ASSETS, "freesansbold.ttf")
+if not os.path.exists(FONT_FILE):
+    FONT_FILE = None
+if not os.path.exists(BOLD_FONT_FILE):
+    BOLD_FONT_FILE = None
 
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Neon Dash — GenZ Runner (v2)")
 clock = pygame.time.Clock()
-font = pygame.font.SysFont("Verdana", 22)
-big_font = pygame.font.SysFont("Verdana", 48, bold=True)
-tiny_font = pygame.font.SysFont("Verdana", 16)
+font = pygame.font.Font(FONT_FILE, 22)
+big_font = pygame.font.Font(BOLD_FONT_FILE, 48)
+tiny_font = pygame.font.Font(FONT_FILE, 16)
+_Surface = pygame.Surface
+
+class TextCache:
+    """Rendered-text cache for the HUD and overlay screens.
+
+    Strings are rasterized once per (font, text, color) and kept in an LRU.
+    Numbers that change every frame (the score) are composed from a cached
+    per-font strip of digit glyphs instead of re-rendering the whole line.
+    """
+    def __init__(self, size=64):
+        self.lru = OrderedDict()
+        self.size = size
+        self.digits = {}
+        self.hits = self.misses = 0
+    def render(self, font, text, color=WHITE):
+        key = (font, text, color)
+        surf = self.lru.get(key)
+        if surf is None:
+            self.misses += 1
+            surf = self.lru[key] = font.render(text, True, color).convert_alpha()
+            if len(self.lru) > self.size:
+                self.lru.popitem(last=False)
+        else:
+            self.hits += 1
+            self.lru.move_to_end(key)
+        return surf
+    def blit_number(self, s, font, prefix, value, pos, color=WHITE):
+        """Blit ``prefix`` followed by the digits of ``value``; returns the covered rect."""
+        glyphs = self.digits.get((font, color))
+        if glyphs is None:
+            glyphs = self.digits[(font, color)] = [
+                font.render(str(d), True, color).convert_alpha() for d in range(10)]
+        head = self.render(font, prefix, color)
+        x, y = pos
+        blits = [(head, pos)]
+        x += head.get_width()
+        for ch in str(value):
+            g = glyphs[ord(ch) - 48]
+            blits.append((g, (x, y)))
+            x += g.get_width()
+        s.blits(blits, doreturn=False)
+        return pygame.Rect(pos[0], y, x - pos[0], head.get_height())
+    def report(self):
+        total = max(1, self.hits + self.misses)
+        return f"text cache: {self.hits} hits, {self.misses} misses ({self.hits/total:.1%} hit rate)"
+
+text = TextCache()
+
+# Every (freq, dur, vol) cue the game plays; synthesized once at startup
+TONE_CUES = [
+    (620, 70, 0.25),   # jump
+    (220, 40, 0.15),   # hard landing
+    (180, 60, 0.25),   # shield break
+    (120, 150, 0.35),  # game over
+    (840, 40, 0.18),   # near-miss streak
+    (500, 80, 0.25),   # shield pickup
+    (300, 80, 0.25),   # slow pickup
+    (760, 60, 0.25),   # score pickup
+]
+
+class ToneBank:
+    """Pre-synthesized beeps played through a fixed pool of reserved channels.
+
+    Cues are built once in the mixer's native format; ad-hoc tones go through a
+    small LRU so repeated calls never re-synthesize. When every pooled channel
+    is busy the oldest voice is stolen instead of stacking new Sound objects.
+    """
+    FORMATS = {8: ("B", 127, 128), -8: ("b", 127, 0), 16: ("H", 32767, 32768),
+               -16: ("h", 32767, 0), -32: ("f", 1.0, 0)}   # get_init() reports float32 as -32
+
+    def __init__(self, cues=(), voices=6, lru_size=16):
+        self.rate, size, self.nch = pygame.mixer.get_init()
+        if size not in self.FORMATS:
+            raise ValueError(f"unsupported mixer sample size {size}")
+        self.typecode, self.amp, self.bias = self.FORMATS[size]
+        if pygame.mixer.get_num_channels() < voices:
+            pygame.mixer.set_num_channels(voices)
+        pygame.mixer.set_reserved(voices)
+        self.channels = [pygame.mixer.Channel(i) for i in range(voices)]
+        self.started = [0] * voices
+        self.plays = 0
+        self.bank = {cue: self._make(*cue) for cue in cues}
+        self.lru = OrderedDict()
+        self.lru_size = lru_size
+    def _samples(self, freq, dur):
+        n = int(dur * self.rate / 1000)
+        if np is not None:
+            wave = np.sin(np.arange(n) * (2*math.pi*freq/self.rate))
+            if self.typecode == "f":
+                mono = wave.astype(np.float32)
+            else:
+                mono = (wave * self.amp + self.bias).astype(np.dtype(self.typecode))
+            return np.repeat(mono, self.nch).tobytes()
+        inc = 2*math.pi*freq/self.rate
+        if self.typecode == "f":
+            mono = [math.sin(i*inc) for i in range(n)]
+        else:
+            mono = [int(math.sin(i*inc)*self.amp) + self.bias for i in range(n)]
+        return array(self.typecode, [v for v in mono for _ in range(self.nch)]).tobytes()
+    def _make(self, freq, dur, vol):
+        snd = pygame.mixer.Sound(buffer=self._samples(freq, dur))
+        snd.set_volume(vol)
+        return snd
+    def get(self, freq, dur, vol):
+        key = (freq, dur, vol)
+        snd = self.bank.get(key)
+        if snd is not None:
+            return snd
+        snd = self.lru.get(key)
+        if snd is None:
+            snd = self.lru[key] = self._make(freq, dur, vol)
+            if len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+        else:
+            self.lru.move_to_end(key)
+        return snd
+    def play(self, freq, dur, vol):
+        snd = self.get(freq, dur, vol)
+        # Idle channel first, otherwise steal the voice that started earliest
+        idx = min(range(len(self.channels)),
+                  key=lambda i: (self.channels[i].get_busy(), self.started[i]))
+        self.plays += 1
+        self.started[idx] = self.plays
+        self.channels[idx].play(snd)
+
+tones = None
+
+def init_audio():
+    """Open the mixer and synthesize the tone bank; silent until this finishes."""
+    global tones
+    try:
+        pygame.mixer.init()
+        bank = ToneBank(TONE_CUES)
+    except Exception:
+        return
+    tones = bank
+
+def start_audio():
+    """Run init_audio on a daemon thread so opening the device never delays a frame."""
+    thread = threading.Thread(target=init_audio, name="audio-init", daemon=True)
+    thread.start()
+    return thread
 
 def play_beep(freq=440, dur=80, vol=0.25):
-    if not SOUND_ON: return
-    sample_rate = 22050
-    n_samples = int(dur * sample_rate / 1000)
-    buf = bytearray()
-    phase = 0.0
-    inc = 2*math.pi*freq/sample_rate
-    for _ in range(n_samples):
-        s = int(127 * math.sin(phase))
-        phase += inc
-        buf += (s + 128).to_bytes(1, 'little', signed=False)
-    snd = pygame.mixer.Sound(buffer=bytes(buf))
-    snd.set_volume(vol)
-    snd.play()
-
-class Particle:
-    def __init__(self, x, y, vx, vy, life, color):
-        self.x, self.y, self.vx, self.vy = x, y, vx, vy
-        self.life = life
-        self.max_life = life
-        self.color = color
+    if tones is None: return
+    tones.play(freq, dur, vol)
+
+class ParticleSystem:
+    """Fixed-capacity particle pool stored as parallel columns.
+
+    Slots are handed out from a free list and returned when their life runs
+    out, so bursts never allocate objects. Drawing blits small pre-rendered
+    sprites picked by color and quantized alpha.
+    """
+    ALPHA_LEVELS = 16
+
+    def __init__(self, capacity=8192):
+        self.capacity = capacity
+        if np is not None:
+            self.x, self.y, self.vx, self.vy, self.life, self.max_life = (
+                np.zeros(capacity, np.float32) for _ in range(6))
+            self.color = np.zeros(capacity, np.uint8)
+            self.alive = np.zeros(capacity, bool)
+        else:
+            self.x, self.y, self.vx, self.vy, self.life, self.max_life = (
+                array("f", bytes(4*capacity)) for _ in range(6))
+            self.color = bytearray(capacity)
+            self.alive = bytearray(capacity)
+        self.free = list(range(capacity-1, -1, -1))
+        self.palette = []
+        self.sprites = []
+    def __len__(self):
+        return self.capacity - len(self.free)
+    def clear(self):
+        self.free = list(range(self.capacity-1, -1, -1))
+        if np is not None:
+            self.alive[:] = False
+        else:
+            self.alive[:] = bytes(self.capacity)
+    def _color_index(self, color):
+        if color not in self.palette:
+            self.palette.append(color)
+            row = []
+            for level in range(self.ALPHA_LEVELS):
+                alpha = 255 * (level + 1) // self.ALPHA_LEVELS
+                surf = pygame.Surface((4, 4), pygame.SRCALPHA)
+                pygame.draw.circle(surf, (*color, alpha), (2, 2), 2)
+                row.append(surf.convert_alpha())
+            self.sprites.append(row)
+        return self.palette.index(color)
+    def emit(self, x, y, count, vx, vy, life, color):
+        """Spawn up to ``count`` particles; ``vx``/``vy``/``life`` are (lo, hi) ranges."""
+        count = min(count, len(self.free))
+        if count <= 0: return
+        ci = self._color_index(color)
+        slots = self.free[-count:]
+        del self.free[-count:]
+        if np is not None:
+            idx = np.array(slots)
+            self.x[idx] = x
+            self.y[idx] = y
+            self.vx[idx] = np.random.uniform(*vx, count)
+            self.vy[idx] = np.random.uniform(*vy, count)
+            self.life[idx] = self.max_life[idx] = np.random.uniform(*life, count)
+            self.color[idx] = ci
+            self.alive[idx] = True
+            return
+        for i in slots:
+            self.x[i], self.y[i] = x, y
+            self.vx[i] = random.uniform(*vx)
+            self.vy[i] = random.uniform(*vy)
+            self.life[i] = self.max_life[i] = random.uniform(*life)
+            self.color[i] = ci
+            self.alive[i] = 1
     def update(self, dt):
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-        self.vy += 40 * dt
-        self.life -= dt
-    def draw(self, s):
-        if self.life <= 0: return
-        alpha = max(0, min(255, int(255 * (self.life / self.max_life))))
-        surf = pygame.Surface((4,4), pygame.SRCALPHA)
-        pygame.draw.circle(surf, (*self.color, alpha), (2,2), 2)
-        s.blit(surf, (self.x, self.y))
-
-class Star:
-    def __init__(self):
-        self.x = random.uniform(0, WIDTH)
-        self.y = random.uniform(0, HEIGHT)
-        self.z = random.uniform(0.3, 1.0)
-        self.tw = random.uniform(0.0, 1.0)
+        if len(self.free) == self.capacity: return
+        if np is not None:
+            self.x += self.vx * dt
+            self.y += self.vy * dt
+            self.vy += 40 * dt
+            self.life -= dt
+            died = self.alive & (self.life <= 0)
+            if died.any():
+                self.alive &= ~died
+                self.free.extend(np.flatnonzero(died).tolist())
+            return
+        for i in range(self.capacity):
+            if not self.alive[i]: continue
+            self.x[i] += self.vx[i] * dt
+            self.y[i] += self.vy[i] * dt
+            self.vy[i] += 40 * dt
+            self.life[i] -= dt
+            if self.life[i] <= 0:
+                self.alive[i] = 0
+                self.free.append(i)
+    def snapshot(self):
+        """The live particles as an immutable ParticleView (sprites picked, positions copied)."""
+        top = self.ALPHA_LEVELS - 1
+        if len(self.free) == self.capacity:
+            return ParticleView((), (), ())
+        if np is not None:
+            idx = np.flatnonzero(self.alive)
+            levels = np.clip((self.life[idx] / self.max_life[idx] * top).astype(np.int32), 0, top)
+            sprites = self.sprites
+            return ParticleView(tuple(sprites[c][lv] for c, lv in zip(self.color[idx].tolist(), levels.tolist())),
+                                self.x[idx], self.y[idx])
+        live = [i for i in range(self.capacity) if self.alive[i]]
+        return ParticleView(
+            tuple(self.sprites[self.color[i]][max(0, min(top, int(self.life[i]/self.max_life[i]*top)))]
+                  for i in live),
+            tuple(self.x[i] for i in live), tuple(self.y[i] for i in live))
+    def draw(self, s, rects=None, k=1.0):
+        if len(self.free) == self.capacity: return
+        self.snapshot().draw(s, rects, k)
+
+class ParticleView(namedtuple("ParticleView", "sprites x y")):
+    """Particles frozen at one moment: a sprite and position per particle."""
+    __slots__ = ()
+    def draw(self, s, rects=None, k=1.0):
+        if not self.sprites: return
+        if np is not None and isinstance(self.x, np.ndarray):
+            xs, ys = (self.x * k).tolist(), (self.y * k).tolist()
+        else:
+            xs, ys = [v * k for v in self.x], [v * k for v in self.y]
+        drawn = s.blits(zip(self.sprites, zip(xs, ys)), doreturn=rects is not None)
+        if rects is not None: rects.extend(drawn)
+
+class Starfield:
+    """Parallax stars kept in parallel columns and drawn from a sprite atlas.
+
+    Positions, depth and twinkle phase update in one batched step; each star
+    is blitted from a pre-rendered sprite picked by its size and quantized
+    glow, so thousands of stars cost a single ``Surface.blits()`` call.
+    """
+    GLOW_LEVELS = 16
+
+    def __init__(self, count, width, height, seed=None):
+        self.count, self.width, self.height = count, width, height
+        self.atlas = []
+        for size in (1, 2, 3):
+            for level in range(self.GLOW_LEVELS):
+                glow = int(150 + 105 * level / (self.GLOW_LEVELS - 1))
+                sprite = pygame.Surface((size*2 + 1, size*2 + 1)).convert()
+                pygame.draw.circle(sprite, (glow, glow, 255), (size, size), size)
+                sprite.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+                self.atlas.append(sprite)
+        if np is not None:
+            self.rng = np.random.default_rng(seed)
+            self.x = self.rng.uniform(0, width, count)
+            self.y = self.rng.uniform(0, height, count)
+            self.z = self.rng.uniform(0.3, 1.0, count)
+            self.tw = self.rng.uniform(0.0, 1.0, count)
+        else:
+            self.x = [random.uniform(0, width) for _ in range(count)]
+            self.y = [random.uniform(0, height) for _ in range(count)]
+            self.z = [random.uniform(0.3, 1.0) for _ in range(count)]
+            self.tw = [random.uniform(0.0, 1.0) for _ in range(count)]
     def update(self, speed, dt):
-        self.x -= speed * self.z * dt
-        if self.x < -2:
-            self.x = WIDTH + random.uniform(0, WIDTH*0.2)
-            self.y = random.uniform(0, HEIGHT)
-            self.z = random.uniform(0.3, 1.0)
-            self.tw = random.uniform(0.0, 1.0)
-        self.tw += dt
-    def draw(self, s):
-        size = int(self.z*2)+1
-        glow = int(150 + 105*abs(math.sin(self.tw*3)))
-        pygame.draw.circle(s, (glow, glow, 255), (int(self.x), int(self.y)), size)
-
-def draw_ground(s, t, ground_y):
+        w, h = self.width, self.height
+        if np is not None:
+            self.x -= speed * self.z * dt
+            self.tw += dt
+            wrap = self.x < -2
+            n = int(wrap.sum())
+            if n:
+                self.x[wrap] = w + self.rng.uniform(0, w*0.2, n)
+                self.y[wrap] = self.rng.uniform(0, h, n)
+                self.z[wrap] = self.rng.uniform(0.3, 1.0, n)
+                self.tw[wrap] = self.rng.uniform(0.0, 1.0, n) + dt
+            return
+        x, z, tw = self.x, self.z, self.tw
+        for i in range(self.count):
+            x[i] -= speed * z[i] * dt
+            if x[i] < -2:
+                x[i] = w + random.uniform(0, w*0.2)
+                self.y[i] = random.uniform(0, h)
+                z[i] = random.uniform(0.3, 1.0)
+                tw[i] = random.uniform(0.0, 1.0)
+            tw[i] += dt
+    def draw(self, s, rects=None, k=1.0):
+        top = self.GLOW_LEVELS - 1
+        atlas = self.atlas
+        if np is not None:
+            size = (self.z * (2 * k)).astype(np.int32) + 1
+            level = (np.abs(np.sin(self.tw * 3)) * top + 0.5).astype(np.int32)
+            sprite = (size - 1) * self.GLOW_LEVELS + level
+            xs = (self.x * k - size).astype(np.int32).tolist()
+            ys = (self.y * k - size).astype(np.int32).tolist()
+            blits = [(atlas[i], (px, py)) for i, px, py in zip(sprite.tolist(), xs, ys)]
+        else:
+            blits = []
+            for x, y, z, tw in zip(self.x, self.y, self.z, self.tw):
+                size = int(z*2*k) + 1
+                level = int(abs(math.sin(tw*3)) * top + 0.5)
+                blits.append((atlas[(size-1)*self.GLOW_LEVELS + level], (int(x*k) - size, int(y*k) - size)))
+        drawn = s.blits(blits, doreturn=rects is not None)
+        if rects is not None: rects.extend(drawn)
+
+def draw_ground(s, t, ground_y, rects=None, k=1.0):
+    gy = int(ground_y * k)
     for i in range(0, WIDTH, 24):
-        yy = ground_y + int(math.sin((i*0.05) + t*4)*2)
-        pygame.draw.line(s, GRAY, (i, yy), (i+12, yy))
-    pygame.draw.line(s, WHITE, (0, ground_y), (WIDTH, ground_y), 2)
-
-def aabb_circle_collision(rect, cx, cy, cr):
-    rx, ry, rw, rh = rect
-    closest_x = max(rx, min(cx, rx + rw))
-    closest_y = max(ry, min(cy, ry + rh))
-    dx = cx - closest_x
-    dy = cy - closest_y
-    return dx*dx + dy*dy <= cr*cr
+        yy = gy + int(math.sin((i*0.05) + t*4)*2*k)
+        pygame.draw.line(s, GRAY, (i*k, yy), ((i+12)*k, yy))
+    pygame.draw.line(s, WHITE, (0, gy), (WIDTH*k, gy), max(1, round(2*k)))
+    if rects is not None: rects.append(pygame.Rect(0, ground_y - 3, WIDTH, 7))
+
+class Layers:
+    """Persistent render surfaces, rebuilt only when the target size changes.
+
+    Holds the back buffer, the pre-drawn grid background and the full-screen
+    overlay/tint layers. Uniform translucent layers are opaque display-format
+    surfaces with a surface alpha, which blit much faster than per-pixel
+    SRCALPHA surfaces of the same size. The back buffer and the tints are
+    only allocated the first time a frame needs them.
+    """
+    TINTS = {"pause_overlay": (0, 0, 0, 160), "game_over_overlay": (0, 0, 0, 180),
+             "slow_tint": (40, 255, 240, 30), "shield_tint": (40, 255, 170, 25)}
+    def __init__(self, size):
+        self.size = None
+        self.resize(size)
+    def __getattr__(self, name):
+        # Only reached for layers not built yet at this size
+        if name == "back":
+            surf = pygame.Surface(self.size).convert()
+        elif name in self.TINTS:
+            surf = self._tint(self.TINTS[name])
+        else:
+            raise AttributeError(name)
+        setattr(self, name, surf)
+        return surf
+    def resize(self, size):
+        if size == self.size: return
+        self.size = w, h = size
+        for name in ("back", *self.TINTS):
+            self.__dict__.pop(name, None)
+        self.background = pygame.Surface(size).convert()
+        self.background.fill(BLACK)
+        step = 40 * w / WIDTH   # same grid whatever the render scale
+        for i in range(int(w / step) + 1):
+            pygame.draw.line(self.background, (30, 30, 60), (i*step, 0), (i*step, h))
+        for j in range(int(h / step) + 1):
+            pygame.draw.line(self.background, (30, 30, 60), (0, j*step), (w, j*step))
+    def _tint(self, rgba):
+        surf = pygame.Surface(self.size).convert()
+        surf.fill(rgba[:3])
+        surf.set_alpha(rgba[3])
+        return surf
+    def begin(self, screen, offscreen):
+        """Return the surface to draw this frame on, primed with the background.
+
+        Frames that need a post-draw offset (screen shake) go to the back
+        buffer; everything else is drawn straight onto the display surface.
+        """
+        target = self.back if offscreen else screen
+        target.blit(self.background, (0, 0))
+        return target
+
+class DirtyRects:
+    """Dirty-rectangle presenter for the optional ``--dirty`` render mode.
+
+    Quiet frames erase last frame's sprite rects from the cached background,
+    record the rects drawn this frame and push both through
+    ``display.update(rects)``. Frames with screen shake or a full-screen
+    overlay/tint, and the frame right after one, are drawn in full and
+    flipped. Tracks frame time and bytes pushed to the display.
+    """
+    def __init__(self):
+        self.rects = []
+        self.prev = []
+        self.was_full = True
+        self.frames = self.full_frames = 0
+        self.bytes_copied = 0
+        self.frame_time = 0.0
+    def begin(self, full):
+        """Start a frame; returns whether it has to be drawn and flipped in full."""
+        full, self.was_full = full or self.was_full, full
+        self.t0 = time.perf_counter()
+        self.rects.clear()
+        return full
+    def erase(self, screen, background):
+        screen.blits([(background, r, r) for r in self.prev], doreturn=False)
+        return screen
+    def present(self, screen, full):
+        bpp = screen.get_bytesize()
+        if full:
+            pygame.display.flip()
+            self.full_frames += 1
+            self.bytes_copied += screen.get_width() * screen.get_height() * bpp
+        else:
+            update = self.prev + self.rects
+            pygame.display.update(update)
+            self.bytes_copied += sum(r.w * r.h for r in update) * bpp
+        self.prev, self.rects = self.rects, self.prev
+        self.frames += 1
+        self.frame_time += time.perf_counter() - self.t0
+    def report(self):
+        n = max(1, self.frames)
+        return (f"dirty rects: {self.frames} frames ({self.full_frames} full), "
+                f"draw+present {self.frame_time/n*1000:.2f} ms/frame, "
+                f"{self.bytes_copied/n/1024:.0f} KiB/frame pushed")
+
+class FrameProfiler:
+    """Per-phase frame timings in a ring buffer, shown by the F3 overlay.
+
+    ``begin()`` starts a frame, ``lap(phase)`` charges the time since the
+    last lap to ``phase`` and ``end(**counts)`` records the frame's counts.
+    """
+    PHASES = ("wait", "input", "spawn", "entities", "collide", "effects", "draw", "hud", "present", "gc")
+    COUNTS = ("obstacles", "pickups", "particles", "stars", "surfaces", "blocks", "alloc_kb", "overlap_pct")
+    WINDOW = 600
+
+    def __init__(self, capacity=600, count_surfaces=False):
+        self.capacity = capacity
+        self.cols = {name: array("d", bytes(8 * capacity)) for name in self.PHASES + ("frame",)}
+        self.counts = {name: array("l", bytes(array("l").itemsize * capacity)) for name in self.COUNTS}
+        self.frames = 0
+        self.show = False
+        self.panel = None
+        self.surfaces = 0
+        self.count_surfaces = count_surfaces
+        profiler = self
+        class CountingSurface(_Surface):
+            def __init__(self, *args, **kwargs):
+                profiler.surfaces += 1
+                super().__init__(*args, **kwargs)
+        self.CountingSurface = CountingSurface
+        self.track_surfaces(count_surfaces)
+    def track_surfaces(self, on):
+        pygame.Surface = self.CountingSurface if on else _Surface
+    def toggle(self):
+        """Show or hide the overlay (F3)."""
+        self.show = not self.show
+        self.track_surfaces(self.show or self.count_surfaces)
+    def begin(self):
+        self.i = self.frames % self.capacity
+        for col in self.cols.values():
+            col[self.i] = 0.0
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.reset_peak()
+            self.traced = tracemalloc.get_traced_memory()[0]
+        self.blocks = sys.getallocatedblocks()
+        self.t0 = self.t = time.perf_counter()
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.cols[phase][self.i] += (now - self.t) * 1000.0
+        self.t = now
+    def end(self, **counts):
+        self.cols["frame"][self.i] = (time.perf_counter() - self.t0) * 1000.0
+        counts["surfaces"] = self.surfaces
+        self.surfaces = 0
+        counts["blocks"] = sys.getallocatedblocks() - self.blocks
+        if self.tracing:
+            counts["alloc_kb"] = (tracemalloc.get_traced_memory()[1] - self.traced) // 1024
+        for name in self.COUNTS:
+            self.counts[name][self.i] = counts.get(name, 0)
+        self.frames += 1
+    def _recent(self, col, n):
+        n = min(n, self.frames, self.capacity)
+        if not n:
+            return [0.0]
+        end = self.frames % self.capacity
+        v = col[end-n:end] if n <= end else col[end-n:] + col[:end]
+        return sorted(v)
+    def summary(self, window=None):
+        """``{column: (p50, p95, p99, worst)}`` in ms over the last ``window`` frames (WINDOW)."""
+        out = {}
+        for name, col in self.cols.items():
+            v = self._recent(col, window or self.WINDOW)
+            pick = lambda q: v[min(len(v) - 1, int(len(v) * q))]
+            out[name] = (pick(0.50), pick(0.95), pick(0.99), v[-1])
+        return out
+    def draw(self, s, font, rects=None):
+        if not self.show: return
+        if self.panel is None or self.frames % 30 == 0:
+            lines = ["phase       p50    p95    p99   worst (ms)"]
+            for name, (p50, p95, p99, worst) in self.summary().items():
+                lines.append(f"{name:<9}{p50:7.2f}{p95:7.2f}{p99:7.2f}{worst:8.2f}")
+            last = (self.frames - 1) % self.capacity
+            lines.append("  ".join(f"{n} {self.counts[n][last]}" for n in self.COUNTS))
+            lines.append(text.report())
+            rows = [font.render(line, True, NEON_GREEN) for line in lines]
+            self.panel = pygame.Surface((max(r.get_width() for r in rows) + 16,
+                                         sum(r.get_height() for r in rows) + 12)).convert()
+            self.panel.fill((0, 0, 0))
+            y = 6
+            for r in rows:
+                self.panel.blit(r, (8, y)); y += r.get_height()
+            self.panel.set_alpha(200)
+        drawn = s.blit(self.panel, (s.get_width() - self.panel.get_width() - 12, 10))
+        if rects is not None: rects.append(drawn)
+    def dump(self, path):
+        """Write the buffered frames, oldest first, as CSV or JSON (by extension)."""
+        n = min(self.frames, self.capacity)
+        start = self.frames - n
+        names = ("frame",) + self.PHASES
+        rows = []
+        for k in range(start, self.frames):
+            i = k % self.capacity
+            row = {"index": k}
+            row.update((name, round(self.cols[name][i], 4)) for name in names)
+            row.update((name, self.counts[name][i]) for name in self.COUNTS)
+            rows.append(row)
+        with open(path, "w", newline="") as f:
+            if str(path).endswith(".json"):
+                import json
+                json.dump({"summary": self.summary(self.capacity), "frames": rows}, f)
+            else:
+                import csv
+                w = csv.DictWriter(f, ["index", *names, *self.COUNTS])
+                w.writeheader()
+                w.writerows(rows)
 
 def screen_shake(intensity):
     return (random.randint(-intensity, intensity),
             random.randint(-intensity, intensity))
 
-class Input:
+def display_refresh_rate():
+    get = getattr(pygame.display, "get_current_refresh_rate", None)   # pygame-ce only
+    if get is None:
+        return FPS
+    try:
+        return get() or FPS
+    except pygame.error:
+        return FPS
+
+def on_battery():
+    """True when running unplugged (psutil if installed, else Linux/Android sysfs)."""
+    try:
+        import psutil
+        battery = psutil.sensors_battery()
+        return battery is not None and not battery.power_plugged
+    except (ImportError, AttributeError):
+        pass
+    try:
+        names = os.listdir("/sys/class/power_supply")
+    except OSError:
+        return False
+    for name in names:
+        # AC adapters have no status file, only online
+        try:
+            with open(f"/sys/class/power_supply/{name}/status") as f:
+                if f.read().strip() == "Discharging":
+                    return True
+        except OSError:
+            continue
+    return False
+
+class FramePacer:
+    """Frame-rate cap for the main loop.
+
+    ``fixed`` always targets FPS. ``adaptive`` matches the display refresh
+    rate, drops to BATTERY_FPS while unplugged and to IDLE_FPS on the pause
+    and game-over screens; the battery state is re-read every few seconds.
+    """
+    POLL = 5.0
+    def __init__(self, mode="adaptive"):
+        self.mode = mode
+        self.refresh = display_refresh_rate()
+        self.battery = on_battery() if mode == "adaptive" else False
+        self.polled = time.monotonic()
+    def target(self, world):
+        if self.mode == "fixed":
+            return FPS
+        now = time.monotonic()
+        if now - self.polled > self.POLL:
+            self.battery, self.polled = on_battery(), now
+        fps = min(self.refresh, BATTERY_FPS) if self.battery else self.refresh
+        if world.paused or world.game_over:
+            fps = min(fps, IDLE_FPS)
+        return fps
+
+class RenderScaler:
+    """Render-scale controller: the scene is drawn at ``scale`` and upscaled.
+
+    With ``auto`` it steps down RENDER_SCALES while the smoothed frame time
+    is over budget and back up once there is clear headroom. Each change
+    waits COOLDOWN frames so the rebuilt layers and new timings settle. A
+    step down that did not make frames cheaper (the upscale costs more than
+    the fill it saves) is undone and becomes the floor.
+    """
+    COOLDOWN = 60
+    def __init__(self, scale=1.0, auto=False, smooth=False):
+        self.auto, self.smooth = auto, smooth
+        # Above 1.0 the scene would skip the upscale; at 0 sprites have no size
+        scale = min(1.0, max(min(RENDER_SCALES), scale))
+        self.level = min(range(len(RENDER_SCALES)), key=lambda i: abs(RENDER_SCALES[i] - scale))
+        self.scale = scale if not auto else RENDER_SCALES[self.level]
+        self.floor = len(RENDER_SCALES) - 1
+        self.avg = self.before = None
+        self.wait = self.COOLDOWN
+        self.budget_ms = 1000.0 / (FPS or 60)
+    def update(self, frame_ms):
+        if not self.auto: return
+        self.avg = frame_ms if self.avg is None else self.avg*0.9 + frame_ms*0.1
+        self.wait -= 1
+        if self.wait > 0: return
+        before, self.before = self.before, None
+        if before is not None and self.avg >= before * 0.95:
+            self.level -= 1
+            self.floor = self.level
+        elif self.avg > self.budget_ms * 0.9 and self.level < self.floor:
+            self.level += 1
+            self.before = self.avg
+        elif self.avg < self.budget_ms * 0.5 and self.level > 0:
+            self.level -= 1
+        else:
+            return
+        self.scale = RENDER_SCALES[self.level]
+        self.avg, self.wait = None, self.COOLDOWN
+    def upscale(self, src, dest):
+        (pygame.transform.smoothscale if self.smooth else pygame.transform.scale)(
+            src, dest.get_size(), dest)
+
+class GCManager:
+    """Keeps cyclic garbage collection out of active play.
+
+    ``start()`` collects once, freezes everything alive after startup
+    (fonts, caches, pools) into the permanent generation so it is never
+    rescanned, and turns automatic collection off. ``frame()`` then
+    collects only where a pause is free: a full collection once per pause
+    or game-over screen, young generations when the frame finished with
+    SLACK_MS to spare, and unconditionally past SAFETY pending objects.
+    """
+    SLACK_MS = 2.0
+    SAFETY = 50000
     def __init__(self):
-        self.reset()
-    def reset(self):
-        self.left = self.right = self.down = False
-        self.jump = False
-        self.jump_pressed = False
-        self.jump_released = False
-        self.pause_pressed = False
-        self.restart_pressed = False
-        self.quit_pressed = False
-    def poll(self):
-        # Reset edge flags each frame
-        self.jump_pressed = False
-        self.jump_released = False
-        self.pause_pressed = False
-        self.restart_pressed = False
-        self.quit_pressed = False
+        self.collections = 0
+        self.idle_done = False
+    def start(self):
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+    def stop(self):
+        gc.enable()
+        gc.unfreeze()
+    def frame(self, idle, slack_ms):
+        if idle:
+            if not self.idle_done:
+                gc.collect()
+                self.idle_done = True
+                self.collections += 1
+            return
+        self.idle_done = False
+        pending, young, _ = gc.get_count()
+        t0, t1, _ = gc.get_threshold()
+        if pending > self.SAFETY or (pending >= t0 and slack_ms > self.SLACK_MS):
+            gc.collect(1 if young >= t1 else 0)
+            self.collections += 1
+    def report(self):
+        return (f"gc: {self.collections} managed collections, "
+                f"{gc.get_freeze_count()} frozen objects, {gc.get_count()[0]} pending")
+
+class LatencyMeter:
+    """Input latency histograms: event to the simulation step, and event to flip.
+
+    ``event(t)`` records a control event taken off the queue at ``t``;
+    ``stepped()`` charges every waiting event to the step that consumed it,
+    ``frame()`` marks the consumed events as part of the frame about to be
+    drawn and ``flipped()`` charges those to the flip. pygame 2 events
+    carry no OS timestamps, so events are stamped when dequeued; the frame
+    pacer drains the queue through Input.wait while it sleeps, which keeps
+    the stamps within about a millisecond of arrival except for events that
+    land while a frame is being worked on.
+    """
+    BUCKETS = 50                  # 1 ms each, the last one open-ended
+    def __init__(self):
+        self.hist = {"event-sim": array("l", bytes(array("l").itemsize * self.BUCKETS)),
+                     "event-flip": array("l", bytes(array("l").itemsize * self.BUCKETS))}
+        self.worst = {name: 0.0 for name in self.hist}
+        self.waiting = []
+        self.stepped_at = []
+        self.shown = []
+    def _add(self, name, ms):
+        self.hist[name][min(self.BUCKETS - 1, int(ms))] += 1
+        self.worst[name] = max(self.worst[name], ms)
+    def event(self, t):
+        self.waiting.append(t)
+    def stepped(self):
+        if not self.waiting: return
+        now = time.perf_counter()
+        for t in self.waiting:
+            self._add("event-sim", (now - t) * 1000.0)
+        self.stepped_at.extend(self.waiting)
+        self.waiting.clear()
+    def frame(self):
+        self.shown.extend(self.stepped_at)
+        self.stepped_at.clear()
+    def flipped(self):
+        if not self.shown: return
+        now = time.perf_counter()
+        for t in self.shown:
+            self._add("event-flip", (now - t) * 1000.0)
+        self.shown.clear()
+    def report(self):
+        lines = ["input latency (ms):"]
+        for name, hist in self.hist.items():
+            n = sum(hist)
+            if not n:
+                lines.append(f"  {name:<10} no events"); continue
+            def pick(q, c=0):
+                for ms, k in enumerate(hist):
+                    c += k
+                    if c >= n * q: return ms + 1
+            lines.append(f"  {name:<10} n={n} p50<{pick(0.5)} p95<{pick(0.95)} p99<{pick(0.99)} "
+                         f"worst {self.worst[name]:.1f}")
+            top = max(hist)
+            for ms, k in enumerate(hist):
+                if k:
+                    label = f"{ms}+" if ms == self.BUCKETS - 1 else f"{ms}-{ms + 1}"
+                    lines.append(f"    {label:>6} {'#' * max(1, 40 * k // top)} {k}")
+        return "\n".join(lines)
+
+class Input(Controls):
+    overlay_pressed = False
+    log = None         # InputLog being recorded
+    replay = None      # InputLog being played back (keyboard then only quits/toggles F3)
+    latency = None     # LatencyMeter timing control events
+    step = 0
+    diverged = None    # first replayed step that failed its checkpoint
+    HANDLED = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP)
+    CONTROL_KEYS = {pygame.K_a, pygame.K_LEFT, pygame.K_d, pygame.K_RIGHT, pygame.K_s, pygame.K_DOWN,
+                    pygame.K_SPACE, pygame.K_w, pygame.K_UP}
+
+    def __init__(self):
+        super().__init__()
+        self.held = []     # (dequeue time, event) taken early by wait/latch, handled at poll
 
+    def poll(self):
+        # Edge flags persist until a simulation step consumes them (Game.step)
+        self.overlay_pressed = False
+        held, self.held = self.held, []
+        for t, e in held:
+            self._handle(e, t)
+        now = time.perf_counter()
         for e in pygame.event.get():
-            if e.type == pygame.QUIT:
+            self._handle(e, now)
+
+    def _handle(self, e, t):
+        if e.type == pygame.QUIT:
+            self.quit_pressed = True
+        elif e.type == pygame.KEYDOWN:
+            if e.key in (pygame.K_a, pygame.K_LEFT): self.left = True
+            if e.key in (pygame.K_d, pygame.K_RIGHT): self.right = True
+            if e.key in (pygame.K_s, pygame.K_DOWN): self.down = True
+            if e.key in (pygame.K_SPACE, pygame.K_w, pygame.K_UP): self.press_jump()
+            if e.key == pygame.K_p: self.pause_pressed = True
+            if e.key == pygame.K_r: self.restart_pressed = True
+            if e.key == pygame.K_ESCAPE: self.quit_pressed = True
+            if e.key == pygame.K_F3: self.overlay_pressed = True
+        elif e.type == pygame.KEYUP:
+            if e.key in (pygame.K_a, pygame.K_LEFT): self.left = False
+            if e.key in (pygame.K_d, pygame.K_RIGHT): self.right = False
+            if e.key in (pygame.K_s, pygame.K_DOWN): self.down = False
+            if e.key in (pygame.K_SPACE, pygame.K_w, pygame.K_UP): self.release_jump()
+        else:
+            return
+        if self.latency and self.replay is None and getattr(e, "key", None) in self.CONTROL_KEYS:
+            self.latency.event(t)
+
+    def wait(self, deadline):
+        """Sleep until ``deadline`` (perf_counter), taking events off the queue as they arrive."""
+        while time.perf_counter() < deadline:
+            now = time.perf_counter()
+            self.held.extend((now, e) for e in pygame.event.get())
+            pygame.time.wait(1)
+
+    def latch(self):
+        """Apply control keys that arrived since poll(), right before a physics step."""
+        if self.replay is not None: return
+        now = time.perf_counter()
+        for e in pygame.event.get((pygame.KEYDOWN, pygame.KEYUP)):
+            if e.key in self.CONTROL_KEYS:
+                self._handle(e, now)
+            else:   # quit, pause, F3...: left to the next poll
+                self.held.append((now, e))
+
+    def stamp(self, dt):
+        """Record or replay this frame's controls; returns the dt to step the world with."""
+        if self.replay is not None:
+            if self.step >= len(self.replay):
                 self.quit_pressed = True
-            elif e.type == pygame.KEYDOWN:
-                if e.key in (pygame.K_a, pygame.K_LEFT): self.left = True
-                if e.key in (pygame.K_d, pygame.K_RIGHT): self.right = True
-                if e.key in (pygame.K_s, pygame.K_DOWN): self.down = True
-                if e.key in (pygame.K_SPACE, pygame.K_w, pygame.K_UP):
-                    if not self.jump:
-                        self.jump_pressed = True
-                    self.jump = True
-                if e.key == pygame.K_p: self.pause_pressed = True
-                if e.key == pygame.K_r: self.restart_pressed = True
-                if e.key == pygame.K_ESCAPE: self.quit_pressed = True
-            elif e.type == pygame.KEYUP:
-                if e.key in (pygame.K_a, pygame.K_LEFT): self.left = False
-                if e.key in (pygame.K_d, pygame.K_RIGHT): self.right = False
-                if e.key in (pygame.K_s, pygame.K_DOWN): self.down = False
-                if e.key in (pygame.K_SPACE, pygame.K_w, pygame.K_UP):
-                    if self.jump:
-                        self.jump_released = True
-                    self.jump = False
-
-class Player:
-    def __init__(self):
-        self.reset()
-    def reset(self):
-        self.x = WIDTH * 0.2
-        self.y = HEIGHT * 0.7
-        self.vx = 0.0
-        self.vy = 0.0
-        self.r = 16
-        self.on_ground = False
-        self.coyote = 0.0          # time after falling where jump is allowed
-        self.jump_buffer = 0.0     # time before landing where jump is queued
-        self.hover = 0.0
-        self.shield = 0.0
-        self.slowmo = 0.0
-        self.combo_time = 0.0
-        self.combo = 0
-        self.alive = True
-    def update(self, inp: Input, dt, ground_y):
-        accel_ground = 1400
-        accel_air = 900
-        max_speed_x = 260
-        friction_ground = 0.86
-        friction_air = 0.98
-        jump_v = -420
-        gravity = 1200
-        max_fall = 950
-        hover_grav = 300
-
-        # Slow-mo halves dt for the player only (world still moves — feels powerful)
-        local_dt = dt * (0.5 if self.slowmo > 0 else 1.0)
-
-        # Timers
-        self.coyote = max(0.0, self.coyote - local_dt)
-        self.jump_buffer = max(0.0, self.jump_buffer - local_dt)
-        self.hover = max(0.0, self.hover - local_dt)
-        self.slowmo = max(0.0, self.slowmo - local_dt)
-        self.shield = max(0.0, self.shield - local_dt) if self.shield>0 else 0.0
-
-        # Queue jump on press
-        if inp.jump_pressed:
-            self.jump_buffer = 0.12
-
-        # Horizontal
-        ax = 0.0
-        if inp.left: ax -= (accel_air if not self.on_ground else accel_ground)
-        if inp.right: ax += (accel_air if not self.on_ground else accel_ground)
-        self.vx += ax * local_dt
-        # Clamp & friction
-        self.vx = max(-max_speed_x, min(max_speed_x, self.vx))
-        self.vx *= (friction_ground if self.on_ground else friction_air)
-
-        # Jump if buffered and allowed (ground or coyote)
-        if self.jump_buffer > 0 and (self.on_ground or self.coyote > 0.0):
-            self.vy = jump_v
-            self.on_ground = False
-            self.coyote = 0.0
-            self.jump_buffer = 0.0
-            self.hover = 0.18
-            play_beep(620, 70, 0.25)
-
-        # Variable jump height: early release trims upward velocity
-        if inp.jump_released and self.vy < -140:
-            self.vy = -140
-
-        # Hover (hold jump briefly after the jump)
-        if inp.jump and not self.on_ground and self.hover > 0:
-            self.vy += (hover_grav - gravity) * local_dt
-
-        # Fast fall
-        if inp.down and not self.on_ground:
-            self.vy += gravity * local_dt * 0.8
-
-        # Gravity
-        self.vy += gravity * local_dt
-        if self.vy > max_fall: self.vy = max_fall
-
-        # Integrate
-        self.x += self.vx * local_dt
-        self.y += self.vy * local_dt
-
-        # Ground collision
-        if self.y + self.r >= ground_y:
-            if not self.on_ground and self.vy > 200:
-                play_beep(220, 40, 0.15)
-            self.y = ground_y - self.r
-            self.vy = 0.0
-            self.on_ground = True
-            self.coyote = 0.12
+                return dt
+            dt = self.replay.apply(self.step, self)
+        elif self.log is not None:
+            dt = self.log.record(self, dt)
+        self.step += 1
+        return dt
+
+    def stepped(self, world):
+        """Checkpoint (recording) or verify (replay) the state after a world step."""
+        if self.latency:
+            self.latency.stepped()
+        if self.replay is not None:
+            if self.diverged is None and not self.replay.verify(self.step - 1, world):
+                self.diverged = self.step - 1
+        elif self.log is not None:
+            self.log.checkpoint(world)
+
+def lerp_pos(e, a):
+    """Position ``a`` of the way from the entity's previous step to its current one."""
+    return e.px + (e.x - e.px) * a, e.py + (e.y - e.py) * a
+
+PICKUP_COLORS = {"shield": NEON_GREEN, "slow": NEON_CYAN}   # anything else: NEON_YELLOW
+
+def _keyed(size):
+    """Blank display-format sprite whose black pixels are transparent."""
+    surf = pygame.Surface(size).convert()
+    surf.fill((0, 0, 0))
+    surf.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+    return surf
+
+class SpriteCache:
+    """Pre-rendered obstacle, pickup and player sprites, drawn with ``blits``.
+
+    Sprites are keyed by kind and on-screen size (world size times the
+    render scale ``k``, quantized to QUANT px) and kept in an LRU. Shapes
+    are colorkeyed display-format surfaces; a spikeball is a strip of
+    SPIKE_FRAMES rotations across one twelfth of a turn, which its twelve
+    spikes repeat. The player glow keeps per-pixel alpha.
+    """
+    QUANT = 2
+    SPIKE_FRAMES = 8
+    def __init__(self, size=512):
+        self.lru = OrderedDict()
+        self.size = size
+        self.hits = self.misses = 0
+        self.pending = None     # sprites pre-rendered by warm(), adopted on the next draw
+    def warm(self, k=1.0):
+        """Pre-render the common sprites at scale ``k`` (safe on a worker thread)."""
+        r = max(2, round(16*k))
+        made = {}
+        for color in (NEON_PINK, NEON_CYAN):
+            made[("glow", color, r)] = self._glow(color, r)
+            made[("disc", color, r, k)] = self._disc(color, r, k)
+        r = max(2, round(Pickup.R*k))
+        for color in (NEON_GREEN, NEON_CYAN, NEON_YELLOW):
+            made[("disc", color, r, k)] = self._disc(color, r, k)
+        for d in sorted({self._px(v, k) for v in range(20, 35)}):
+            made[("spikeball", d, k)] = self._spikeball(d, k)
+        self.pending = made
+    def _get(self, key, make):
+        surf = self.lru.get(key)
+        if surf is None:
+            self.misses += 1
+            surf = self.lru[key] = make(*key[1:])
+            if len(self.lru) > self.size:
+                self.lru.popitem(last=False)
         else:
-            # left the ground
-            if self.on_ground and self.vy > 0:
-                self.coyote = 0.12
-            self.on_ground = False
-
-        # Combo timer
-        self.combo_time = max(0.0, self.combo_time - dt)
-        if self.combo_time <= 0 and self.combo > 0:
-            self.combo = 0
-    def draw(self, s):
-        glow = pygame.Surface((self.r*6, self.r*6), pygame.SRCALPHA)
-        col = NEON_CYAN if self.shield>0 else NEON_PINK
-        pygame.draw.circle(glow, (*col, 40), (self.r*3, self.r*3), self.r*3)
-        s.blit(glow, (self.x - self.r*3, self.y - self.r*3))
-        pygame.draw.circle(s, col, (int(self.x), int(self.y)), self.r)
-        pygame.draw.circle(s, WHITE, (int(self.x), int(self.y)), self.r, 2)
-
-class Obstacle:
-    def __init__(self, kind, x, y, w, h, speed):
-        self.kind = kind
-        self.x, self.y, self.w, self.h = x, y, w, h
-        self.base_y = y
-        self.speed = speed
-        self.phase = random.random()*6.28
-        self.alive = True
-    def update(self, dt, difficulty):
-        self.x -= self.speed * dt
-        if self.kind == "laser":
-            self.y = self.base_y + math.sin(self.phase + pygame.time.get_ticks()*0.002)*30
-        elif self.kind == "spikeball":
-            self.y = self.base_y + math.sin(self.phase + pygame.time.get_ticks()*0.004)*50
-        if self.x + self.w < -120:
-            self.alive = False
-    def rect(self):
-        return pygame.Rect(self.x, self.y, self.w, self.h)
-    def draw(self, s):
-        if self.kind == "block":
-            pygame.draw.rect(s, NEON_PURPLE, self.rect(), border_radius=8)
-            pygame.draw.rect(s, WHITE, self.rect(), 2, border_radius=8)
-        elif self.kind == "laser":
-            r = self.rect()
-            pygame.draw.rect(s, NEON_PINK, r, border_radius=6)
-            pygame.draw.rect(s, WHITE, r, 2, border_radius=6)
-        elif self.kind == "spikeball":
-            r = self.rect()
-            cx, cy = r.center
-            pygame.draw.circle(s, NEON_YELLOW, (cx, cy), r.width//2)
+            self.hits += 1
+            self.lru.move_to_end(key)
+        return surf
+    def _px(self, v, k):
+        q = self.QUANT
+        return max(q, int(v * k / q + 0.5) * q)
+
+    @staticmethod
+    def _box(kind, w, h, k):
+        surf = _keyed((w, h))
+        color, radius = (NEON_PURPLE, 8) if kind == "block" else (NEON_PINK, 6)
+        pygame.draw.rect(surf, color, surf.get_rect(), border_radius=round(radius*k))
+        pygame.draw.rect(surf, WHITE, surf.get_rect(), max(1, round(2*k)), border_radius=round(radius*k))
+        return surf
+    def _spikeball(self, d, k):
+        spike = max(1, round(3*k))
+        reach = d//2 + 8*k
+        size = d + 2 * (int(8*k) + spike + 1)
+        strip = _keyed((size * self.SPIKE_FRAMES, size))
+        for f in range(self.SPIKE_FRAMES):
+            cx = cy = size // 2
+            cx += f * size
+            pygame.draw.circle(strip, NEON_YELLOW, (cx, cy), d//2)
+            turn = f * (math.pi/6) / self.SPIKE_FRAMES
             for i in range(12):
-                ang = i*math.pi/6 + (pygame.time.get_ticks()*0.01)%6.28
-                px = int(cx + math.cos(ang)*(r.width//2 + 8))
-                py = int(cy + math.sin(ang)*(r.width//2 + 8))
-                pygame.draw.circle(s, NEON_YELLOW, (px, py), 3)
-            pygame.draw.circle(s, WHITE, (cx, cy), r.width//2, 2)
-
-class Pickup:
-    def __init__(self, kind, x, y, speed):
-        self.kind = kind
-        self.x, self.y = x, y
-        self.speed = speed
-        self.r = 10
-        self.alive = True
-        self.phase = random.random()*6.28
-    def update(self, dt):
-        self.x -= self.speed * dt
-        self.y += math.sin(self.phase + pygame.time.get_ticks()*0.003) * 0.2
-        if self.x < -50: self.alive = False
-    def rect(self):
-        return pygame.Rect(self.x-self.r, self.y-self.r, self.r*2, self.r*2)
-    def draw(self, s):
-        col = NEON_GREEN if self.kind=="shield" else (NEON_CYAN if self.kind=="slow" else NEON_YELLOW)
-        pygame.draw.circle(s, col, (int(self.x), int(self.y)), self.r)
-        pygame.draw.circle(s, WHITE, (int(self.x), int(self.y)), self.r, 2)
-
-def main():
-    stars = [Star() for _ in range(120)]
-    player = Player()
-    particles = []
-    obstacles = []
-    pickups = []
-
-    t0 = time.time()
-    score = 0.0
-    best = 0.0
-    speed = 240.0
-    ground_y = int(HEIGHT * 0.8)
-    spawn_timer = 0.0
-    pickup_timer = 2.0
-    shake = 0.0
-    paused = False
-    game_over = False
-    inp = Input()
+                ang = i*math.pi/6 + turn
+                pygame.draw.circle(strip, NEON_YELLOW, (int(cx + math.cos(ang)*reach),
+                                                        int(cy + math.sin(ang)*reach)), spike)
+            pygame.draw.circle(strip, WHITE, (cx, cy), d//2, max(1, round(2*k)))
+        return strip
+    @staticmethod
+    def _disc(color, r, k):
+        surf = _keyed((2*r + 1, 2*r + 1))
+        pygame.draw.circle(surf, color, (r, r), r)
+        pygame.draw.circle(surf, WHITE, (r, r), r, max(1, round(2*k)))
+        return surf
+    @staticmethod
+    def _glow(color, r):
+        surf = pygame.Surface((r*6, r*6), pygame.SRCALPHA)
+        pygame.draw.circle(surf, (*color, 40), (r*3, r*3), r*3)
+        return surf.convert_alpha()
 
-    while True:
-        dt = clock.tick(FPS) / 1000.0
-        dt = min(dt, 1/45.0)
+    def draw_world(self, s, world, t, rects=None, a=1.0, k=1.0):
+        """Blit every obstacle and pickup at interpolation ``a`` and render scale ``k``."""
+        if self.pending:
+            for key, surf in self.pending.items():
+                self.lru.setdefault(key, surf)
+            self.pending = None
+        blits = []
+        frames = self.SPIKE_FRAMES
+        frame = int((t*10.0) % 6.28 % (math.pi/6) / (math.pi/6) * frames) % frames
+        for ob in world.obstacles:
+            x, y = lerp_pos(ob, a)
+            if ob.kind == "spikeball":
+                d = self._px(ob.w, k)
+                strip = self._get(("spikeball", d, k), self._spikeball)
+                size = strip.get_height()
+                # Centered on the ball, which may differ from the quantized size by a pixel
+                blits.append((strip, ((x + ob.w*0.5)*k - size//2, (y + ob.h*0.5)*k - size//2),
+                              (frame * size, 0, size, size)))
+            else:
+                key = ("box", ob.kind, self._px(ob.w, k), self._px(ob.h, k), k)
+                blits.append((self._get(key, self._box), (x*k, y*k)))
+        for pk in world.pickups:
+            x, y = lerp_pos(pk, a)
+            r = max(2, round(pk.r*k))
+            color = PICKUP_COLORS.get(pk.kind, NEON_YELLOW)
+            blits.append((self._get(("disc", color, r, k), self._disc), (int(x*k) - r, int(y*k) - r)))
+        drawn = s.blits(blits, doreturn=rects is not None)
+        if rects is not None: rects.extend(drawn)
+
+    def draw_player(self, s, p, rects=None, a=1.0, k=1.0):
+        x, y = lerp_pos(p, a)
+        x, y, r = int(x*k), int(y*k), max(2, round(p.r*k))
+        color = NEON_CYAN if p.shield>0 else NEON_PINK
+        glow = self._get(("glow", color, r), self._glow)
+        body = self._get(("disc", color, r, k), self._disc)
+        drawn = s.blits(((glow, (x - r*3, y - r*3)), (body, (x - r, y - r))), doreturn=rects is not None)
+        if rects is not None: rects.append(drawn[0])
+
+def present_events(world, particles):
+    """Turn the simulation's sound/burst/restart events into audio and particles."""
+    for ev in world.events:
+        if ev[0] == "beep":
+            play_beep(*ev[1:])
+        elif ev[0] == "burst":
+            _, x, y, kind = ev
+            if kind == "shield":
+                particles.emit(x, y, SHIELD_BURST, (-120,120), (-160,-40), (0.2,0.6), NEON_CYAN)
+            else:
+                particles.emit(x, y, PICKUP_BURST, (-80,80), (-120,-10), (0.2,0.5), NEON_YELLOW)
+        elif ev[0] == "restart":
+            particles.clear()
+
+# Immutable copies of what drawing reads, with the attribute names of the live objects
+EntityView = namedtuple("EntityView", "kind x y px py w h r")
+PlayerView = namedtuple("PlayerView", "x y px py r shield slowmo combo")
+Snapshot = namedtuple("Snapshot", "time score best speed shake paused game_over ground_y "
+                                  "player obstacles pickups particles alpha")
+
+def snapshot(world, particles, alpha):
+    p = world.player
+    return Snapshot(world.time, world.score, world.best, world.speed, world.shake, world.paused,
+                    world.game_over, world.ground_y,
+                    PlayerView(p.x, p.y, p.px, p.py, p.r, p.shield, p.slowmo, p.combo),
+                    tuple(EntityView(o.kind, o.x, o.y, o.px, o.py, o.w, o.h, 0) for o in world.obstacles),
+                    tuple(EntityView(k.kind, k.x, k.y, k.px, k.py, 0, 0, k.r) for k in world.pickups),
+                    particles.snapshot(), alpha)
 
-        # ------- Input -------
+class Pipeline:
+    """Runs a Game's simulation on a worker thread, one frame ahead of drawing.
+
+    Each frame the render (main) thread collects the Snapshot the worker
+    finished last frame, polls input, hands the worker this frame's dt and
+    then draws the collected snapshot while the worker steps the world,
+    particles and effects. The two snapshot slots form a double buffer:
+    the worker only writes ``back`` and drawing only reads ``front``, and
+    input is only touched while the worker is idle, so no locks are needed.
+    Drawing overlaps the simulation wherever pygame releases the GIL (fills,
+    blits, transforms); the cost is one frame of extra latency.
+    """
+    def __init__(self, game):
+        self.game = game
+        self.front = None       # taken from the game on first use (main may swap the world)
+        self.back = None
+        self.dt = 0.0
+        self.running = True     # False once a replay runs out
+        self.busy = False
+        self.closed = False
+        self.go = threading.Event()
+        self.done = threading.Event()
+        self.sim = (0.0, 0.0)       # start and end of the last simulation job
+        self.render = (0.0, 0.0)    # start and end of the last draw
+        self.sim_ms = self.render_ms = self.overlap_ms = self.wait_ms = 0.0
+        self.frames = 0
+        threading.Thread(target=self._work, name="simulation", daemon=True).start()
+
+    def _work(self):
+        game = self.game
+        while True:
+            self.go.wait()
+            self.go.clear()
+            if self.closed:
+                return
+            t = time.perf_counter()
+            dt = self.dt
+            self.running = game.advance(dt)
+            world = game.world
+            if not world.paused and not world.game_over:
+                game.particles.update(dt)
+            self.back = snapshot(world, game.particles, min(1.0, game.acc / SIM_DT))
+            self.sim = (t, time.perf_counter())
+            self.done.set()
+            # A short slice of level generation; the render thread never touches the world
+            world.prebuild(time.perf_counter() + LEVEL_SLICE_MS / 1000.0)
+
+    def collect(self):
+        """Wait for the job kicked last frame and swap its snapshot to the front."""
+        if self.busy:
+            t = time.perf_counter()
+            self.done.wait()
+            self.done.clear()
+            self.busy = False
+            self.wait_ms += (time.perf_counter() - t) * 1000.0
+            self.front, self.back = self.back, None
+            if self.game.inp.latency:
+                self.game.inp.latency.frame()
+        elif self.front is None:
+            self.front = snapshot(self.game.world, self.game.particles, 1.0)
+        return self.front
+
+    def overlap(self):
+        """Milliseconds the last simulation job and the draw it ran beside overlapped."""
+        (s0, s1), (r0, r1) = self.sim, self.render
+        return max(0.0, min(s1, r1) - max(s0, r0)) * 1000.0
+
+    def frame(self, dt):
+        game = self.game
+        profiler = game.profiler
+        profiler.begin()
+        t0 = time.perf_counter()
+        view = self.collect()
+        profiler.lap("wait")
+        overlap = self.overlap()
+        sim_ms = (self.sim[1] - self.sim[0]) * 1000.0
+        if self.frames:
+            self.sim_ms += sim_ms
+            self.overlap_ms += overlap
+        inp = game.inp
         inp.poll()
-        if inp.quit_pressed:
-            pygame.quit(); sys.exit()
+        profiler.lap("input")
+        if inp.overlay_pressed:
+            profiler.toggle()
+        if inp.quit_pressed or not self.running:
+            return False
+        self.dt = dt
+        self.busy = True
+        self.go.set()
+        r0 = time.perf_counter()
+        # Background stars are cosmetic and live on the render side
+        game.stars.update(view.speed*0.12, dt)
+        profiler.lap("effects")
+        game.draw(view.alpha, view)
+        r1 = time.perf_counter()
+        self.render = (r0, r1)
+        self.render_ms += (r1 - r0) * 1000.0
+        self.frames += 1
+        frame_ms = (r1 - t0) * 1000.0
+        game.scaler.update(frame_ms)
+        if game.gc:
+            game.gc.frame(view.paused or view.game_over, game.scaler.budget_ms - frame_ms)
+            profiler.lap("gc")
+        profiler.end(obstacles=len(view.obstacles), pickups=len(view.pickups),
+                     particles=len(view.particles.sprites), stars=game.stars.count,
+                     overlap_pct=int(100 * overlap / sim_ms) if sim_ms else 0)
+        return True
 
-        if not game_over and inp.pause_pressed:
-            paused = not paused
+    def close(self):
+        self.collect()
+        self.closed = True
+        self.go.set()
 
-        if game_over and inp.restart_pressed:
-            # reset
-            player = Player()
-            particles.clear()
-            obstacles.clear()
-            pickups.clear()
-            t0 = time.time()
-            score = 0.0
-            speed = 240.0
-            spawn_timer = 0.0
-            pickup_timer = 2.0
-            shake = 0.0
-            paused = False
-            game_over = False
-
-        # ------- Update -------
+    def report(self):
+        n = max(1, self.frames - 1)
+        sim, overlap = self.sim_ms / n, self.overlap_ms / n
+        return (f"pipeline: sim {sim:.2f} ms, render {self.render_ms / max(1, self.frames):.2f} ms, "
+                f"overlap {overlap:.2f} ms ({100 * overlap / sim if sim else 0:.0f}% of sim), "
+                f"render waited {self.wait_ms / max(1, self.frames):.2f} ms per frame")
+
+class Game:
+    """One play session: the world plus its effects, input and render state.
+
+    ``frame(dt)`` runs a complete frame (input, update, draw, present) and
+    returns False once quit is requested. The world advances in fixed
+    SIM_DT steps drained from an accumulator, and drawing interpolates
+    entities between the last two steps by the leftover fraction. ``seed``
+    fixes the world and the cosmetic RNGs so scripted sessions replay
+    identically. ``scaler`` sets the resolution the scene is drawn at; the
+    world keeps its native coordinates whatever the scale. ``gc_manager``
+    (a started GCManager) schedules garbage collection between frames.
+    ``pipeline`` moves the simulation onto its own thread (see Pipeline).
+    ``late_input`` re-reads control keys right before each physics step
+    (serial mode only; SDL events are read on the main thread).
+    """
+    def __init__(self, seed=None, stress=0, dirty=False, trace_frames=600, scaler=None,
+                 gc_manager=None, pipeline=False, late_input=False):
+        if seed is not None:
+            random.seed(seed)
+            if np is not None: np.random.seed(seed)
+        self.profiler = FrameProfiler(trace_frames)
+        self.stars = Starfield(STAR_COUNT, WIDTH, HEIGHT, seed)
+        self.world = World(WIDTH, HEIGHT, seed=seed, stress=stress)
+        self.world.timer = self.profiler
+        self.particles = ParticleSystem()
+        self.sprites = SpriteCache()
+        threading.Thread(target=self.sprites.warm, name="sprite-warm", daemon=True).start()
+        self.first_frame_ms = None  # module load to the first presented frame
+        self.inp = Input()
+        self.layers = Layers(screen.get_size())
+        self.scaled = None          # Layers at the reduced render size, built on first use
+        self.dirty = DirtyRects() if dirty else None
+        # Dirty rects are tracked at native resolution, so that mode always draws at 1.0
+        self.scaler = RenderScaler() if scaler is None or dirty else scaler
+        self.acc = 0.0
+        self.gc = gc_manager
+        self.late_input = late_input
+        self.pipeline = None
+        if pipeline:
+            # Phase laps come from the render thread only
+            self.world.timer = None
+            self.pipeline = Pipeline(self)
+
+    def frame(self, dt):
+        if self.pipeline:
+            return self.pipeline.frame(dt)
+        profiler = self.profiler
+        profiler.begin()
+        t0 = time.perf_counter()
+        self.inp.poll()
+        profiler.lap("input")
+        if self.inp.overlay_pressed:
+            profiler.toggle()
+        if self.inp.quit_pressed:
+            return False
+        if not self.advance(dt):
+            return False
+        if self.inp.latency:
+            self.inp.latency.frame()
+        self.update(dt)
+        self.draw(min(1.0, self.acc / SIM_DT))
+        frame_ms = (time.perf_counter() - t0) * 1000.0
+        self.scaler.update(frame_ms)
+        world = self.world
+        if self.gc:
+            self.gc.frame(world.paused or world.game_over, self.scaler.budget_ms - frame_ms)
+            profiler.lap("gc")
+        # Generate the level ahead in what is left of the frame budget
+        slack_ms = self.scaler.budget_ms - (time.perf_counter() - t0) * 1000.0 - LEVEL_RESERVE_MS
+        if slack_ms > 0:
+            world.prebuild(time.perf_counter() + slack_ms / 1000.0)
+            profiler.lap("spawn")
+        profiler.end(obstacles=len(self.world.obstacles), pickups=len(self.world.pickups),
+                     particles=len(self.particles), stars=self.stars.count)
+        return True
+
+    def advance(self, dt):
+        """Add ``dt`` to the accumulator and drain it in fixed steps; False once a replay ends."""
+        self.acc += dt
+        steps = 0
+        while self.acc >= SIM_DT:
+            if steps == MAX_STEPS:
+                self.acc = 0.0
+                break
+            if self.late_input and not self.pipeline:
+                self.inp.latch()
+            step_dt = self.inp.stamp(SIM_DT)
+            if self.inp.quit_pressed:   # replay finished
+                return False
+            self.step(step_dt)
+            self.acc -= step_dt
+            steps += 1
+        return True
+
+    def step(self, dt):
+        """One fixed simulation step; its events are presented before the next clears them."""
+        world = self.world
+        world.step(self.inp, dt)
+        self.inp.stepped(world)
+        self.inp.clear_edges()
+        present_events(world, self.particles)
+        if not self.pipeline:
+            self.profiler.lap("effects")
+
+    def update(self, dt):
+        """Per-frame cosmetics, advanced by the real frame time."""
+        world = self.world
         # Background always animates
-        for st in stars:
-            st.update(speed*0.12, dt)
-
-        if not paused and not game_over:
-            elapsed = time.time() - t0
-            difficulty = 1.0 + min(2.5, elapsed / 45.0)
-            speed += dt * (10.0 + difficulty*6.0)
-            score += dt * (10.0 * difficulty) * (1 + 0.1*player.combo)
-            spawn_rate = 1.15 / difficulty
-            spawn_timer -= dt
-            pickup_timer -= dt
-
-            # Spawn obstacles
-            if spawn_timer <= 0:
-                spawn_timer = random.uniform(max(0.32, 0.9*spawn_rate), 1.05*spawn_rate)
-                pattern = random.choice(["block", "laser", "spike", "stack", "mix"] if difficulty>1.2 else ["block", "laser"])
-                base_x = WIDTH + 30
-                if pattern == "block":
-                    h = random.randint(16, 60)
-                    obstacles.append(Obstacle("block", base_x, ground_y - h, random.randint(24, 48), h, speed))
-                elif pattern == "laser":
-                    h = random.randint(12, 20)
-                    y = random.randint(int(HEIGHT*0.45), ground_y-60)
-                    obstacles.append(Obstacle("laser", base_x, y, random.randint(80, 140), h, speed*1.1))
-                elif pattern == "spike":
-                    sz = random.randint(22, 34)
-                    y = random.randint(int(HEIGHT*0.45), ground_y-40)
-                    obstacles.append(Obstacle("spikeball", base_x, y, sz, sz, speed*1.05))
-                elif pattern == "stack":
-                    step = random.randint(18, 28)
-                    for i in range(random.randint(2,4)):
-                        h = step*(i+1)
-                        obstacles.append(Obstacle("block", base_x + i*48, ground_y - h, 36, h, speed))
-                else:
-                    h = random.randint(16, 48)
-                    obstacles.append(Obstacle("block", base_x, ground_y - h, random.randint(24, 48), h, speed))
-                    sz = random.randint(20, 28)
-                    obstacles.append(Obstacle("spikeball", base_x+120, random.randint(int(HEIGHT*0.45), ground_y-60), sz, sz, speed*1.05))
-
-            if pickup_timer <= 0:
-                pickup_timer = random.uniform(3.0/difficulty, 6.0/difficulty)
-                kind = random.choices(["shield","slow","score"], weights=[1.2, 1.0, 1.4])[0]
-                y = random.randint(int(HEIGHT*0.35), ground_y-80)
-                pickups.append(Pickup(kind, WIDTH+20, y, speed*0.9))
-
-            # Entities
-            player.update(inp, dt, ground_y)
-            for ob in obstacles: ob.update(dt, difficulty)
-            for pk in pickups: pk.update(dt)
-
-            obstacles = [o for o in obstacles if o.alive]
-            pickups = [p for p in pickups if p.alive]
-
-            # Collisions
-            pre_combo = player.combo
-            near_miss = False
-            for ob in obstacles:
-                if aabb_circle_collision(ob.rect(), player.x, player.y, player.r):
-                    if player.shield > 0:
-                        player.shield = 0.0
-                        shake = 10
-                        play_beep(180, 60, 0.25)
-                        for _ in range(30):
-                            particles.append(Particle(player.x, player.y, random.uniform(-120,120), random.uniform(-160, -40), random.uniform(0.2,0.6), NEON_CYAN))
-                        ob.alive = False
-                    else:
-                        game_over = True
-                        best = max(best, score)
-                        play_beep(120, 150, 0.35)
-                        break
-                else:
-                    r = ob.rect()
-                    dx = max(r.left - player.x, 0, player.x - r.right)
-                    dy = max(r.top - player.y, 0, player.y - r.bottom)
-                    dist = math.hypot(dx, dy)
-                    if dist < player.r + 12:
-                        near_miss = True
-            if near_miss:
-                player.combo = min(20, player.combo + 1 if player.combo_time>0 else 1)
-                player.combo_time = 1.2
-                if player.combo != pre_combo:
-                    play_beep(840, 40, 0.18)
-
-            for pk in pickups:
-                if aabb_circle_collision(pk.rect(), player.x, player.y, player.r):
-                    pk.alive = False
-                    if pk.kind == "shield":
-                        player.shield = 6.0
-                        play_beep(500, 80, 0.25)
-                    elif pk.kind == "slow":
-                        player.slowmo = 2.1
-                        play_beep(300, 80, 0.25)
-                    else:
-                        score += 80 + 10*player.combo
-                        play_beep(760, 60, 0.25)
-                        for _ in range(12):
-                            particles.append(Particle(pk.x, pk.y, random.uniform(-80,80), random.uniform(-120,-10), random.uniform(0.2,0.5), NEON_YELLOW))
-
-            for pr in particles: pr.update(dt)
-            particles[:] = [p for p in particles if p.life>0]
-            shake = max(0.0, shake - dt*20)
-
-        # ------- Draw -------
-        base = pygame.Surface((WIDTH, HEIGHT))
-        base.fill(BLACK)
-        for i in range(0, WIDTH, 40):
-            pygame.draw.line(base, (30, 30, 60), (i, 0), (i, HEIGHT))
-        for j in range(0, HEIGHT, 40):
-            pygame.draw.line(base, (30, 30, 60), (0, j), (WIDTH, j))
-
-        for st in stars: st.draw(base)
-        draw_ground(base, pygame.time.get_ticks()/1000.0, ground_y)
-        for ob in obstacles: ob.draw(base)
-        for pk in pickups: pk.draw(base)
-        for pr in particles: pr.draw(base)
-        player.draw(base)
-
-        info = [f"Score {int(score)}", f"Best {int(best)}"]
+        self.stars.update(world.speed*0.12, dt)
+        if not world.paused and not world.game_over:
+            self.particles.update(dt)
+        self.profiler.lap("effects")
+
+    def draw(self, alpha=1.0, view=None):
+        """Draw and present the world, or ``view`` (a Snapshot) in its place."""
+        world = self.world if view is None else view
+        particles = self.particles if view is None else view.particles
+        dirty, profiler = self.dirty, self.profiler
+        sprites = self.sprites
+        # A frozen world has no step to interpolate from
+        a = 1.0 if world.paused or world.game_over else alpha
+        t = world.time - (1.0 - a) * SIM_DT
+        k = self.scaler.scale
+        self.layers.resize(screen.get_size())
+        if k < 1.0:
+            size = screen.get_size()
+            size = (max(1, int(size[0]*k)), max(1, int(size[1]*k)))
+            if self.scaled is None:
+                self.scaled = Layers(size)
+            self.scaled.resize(size)
+        layers = self.scaled if k < 1.0 else self.layers
+        player = world.player
+        full = True
+        rects = None
+        if dirty:
+            full = dirty.begin(world.shake > 0 or world.paused or world.game_over
+                               or player.slowmo > 0 or player.shield > 0)
+            rects = dirty.rects
+        if full:
+            base = layers.begin(screen, world.shake > 0 or k < 1.0)
+        else:
+            base = dirty.erase(screen, layers.background)
+
+        # Scene and full-screen layers at the render scale
+        self.stars.draw(base, rects, k)
+        draw_ground(base, pygame.time.get_ticks()/1000.0, world.ground_y, rects, k)
+        sprites.draw_world(base, world, t, rects, a, k)
+        particles.draw(base, rects, k)
+        sprites.draw_player(base, player, rects, a, k)
+        if world.paused:
+            base.blit(layers.pause_overlay, (0,0))
+        if world.game_over:
+            base.blit(layers.game_over_overlay, (0,0))
+        if player.slowmo>0:
+            base.blit(layers.slow_tint, (0,0))
+        if player.shield>0:
+            base.blit(layers.shield_tint, (0,0))
+        if k < 1.0 and world.shake <= 0:
+            self.scaler.upscale(base, screen)
+        elif base is not screen:
+            if k < 1.0:
+                # Shaking needs an offset blit, so upscale into the native back buffer first
+                self.scaler.upscale(base, self.layers.back)
+                base = self.layers.back
+            screen.blit(base, screen_shake(int(world.shake)))
+        profiler.lap("draw")
+
+        # HUD and text at native resolution
+        x, y = 12, 10
+        for prefix, value in (("Score ", int(world.score)), ("Best ", int(world.best))):
+            drawn = text.blit_number(screen, font, prefix, value, (x, y)); y += drawn.height+2
+            if rects is not None: rects.append(drawn)
+        info = []
         if player.combo>0: info.append(f"STREAK x{player.combo}")
         if player.shield>0: info.append("Shield")
         if player.slowmo>0: info.append("SLOW")
-        x, y = 12, 10
-        for t in info:
-            surf = font.render(t, True, WHITE); base.blit(surf, (x, y)); y += surf.get_height()+2
-
-        if paused:
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA); overlay.fill((0,0,0,160))
-            base.blit(overlay, (0,0))
-            txt = big_font.render("Paused — P to resume", True, WHITE)
-            base.blit(txt, (WIDTH//2 - txt.get_width()//2, HEIGHT//2 - txt.get_height()//2))
-
-        if game_over:
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA); overlay.fill((0,0,0,180))
-            base.blit(overlay, (0,0))
-            txt = big_font.render("Game Over", True, WHITE)
-            base.blit(txt, (WIDTH//2 - txt.get_width()//2, HEIGHT//2 - 90))
-            sc = font.render(f"Score: {int(score)}   Best: {int(best)}", True, WHITE)
-            base.blit(sc, (WIDTH//2 - sc.get_width()//2, HEIGHT//2 - 30))
-            hint = font.render("Press R to restart, ESC to quit", True, WHITE)
-            base.blit(hint, (WIDTH//2 - hint.get_width()//2, HEIGHT//2 + 20))
+        for label in info:
+            surf = text.render(font, label); drawn = screen.blit(surf, (x, y)); y += surf.get_height()+2
+            if rects is not None: rects.append(drawn)
 
-        if player.slowmo>0:
-            tint = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA); tint.fill((40, 255, 240, 30)); base.blit(tint, (0,0))
-        if player.shield>0:
-            tint = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA); tint.fill((40, 255, 170, 25)); base.blit(tint, (0,0))
+        if world.paused:
+            txt = text.render(big_font, "Paused — P to resume")
+            screen.blit(txt, (WIDTH//2 - txt.get_width()//2, HEIGHT//2 - txt.get_height()//2))
+
+        if world.game_over:
+            txt = text.render(big_font, "Game Over")
+            screen.blit(txt, (WIDTH//2 - txt.get_width()//2, HEIGHT//2 - 90))
+            sc = text.render(font, f"Score: {int(world.score)}   Best: {int(world.best)}")
+            screen.blit(sc, (WIDTH//2 - sc.get_width()//2, HEIGHT//2 - 30))
+            hint = text.render(font, "Press R to restart, ESC to quit")
+            screen.blit(hint, (WIDTH//2 - hint.get_width()//2, HEIGHT//2 + 20))
 
-        if shake>0:
-            ox, oy = screen_shake(int(shake))
+        if world.time < 6 and not world.game_over:
+            hint = text.render(tiny_font, "SPACE to jump (buffered) • Hold to hover • S/DOWN fast-fall • A/D move • P pause")
+            drawn = screen.blit(hint, (WIDTH//2 - hint.get_width()//2, HEIGHT-28))
+            if rects is not None: rects.append(drawn)
+        profiler.draw(screen, tiny_font, rects)
+        profiler.lap("hud")
+
+        if dirty:
+            dirty.present(screen, full)
         else:
-            ox, oy = 0, 0
-        screen.blit(base, (ox, oy))
+            pygame.display.flip()
+        if self.inp.latency:
+            self.inp.latency.flipped()
+        if self.first_frame_ms is None:
+            self.first_frame_ms = (time.perf_counter() - STARTED) * 1000.0
+        profiler.lap("present")
+
+def take_alloc_snapshot():
+    return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
 
-        if (time.time() - t0) < 6 and not game_over:
-            hint = tiny_font.render("SPACE to jump (buffered) • Hold to hover • S/DOWN fast-fall • A/D move • P pause", True, WHITE)
-            screen.blit(hint, (WIDTH//2 - hint.get_width()//2, HEIGHT-28))
+def main(stress=0, dirty=False, trace=None, record=None, play=None, pace="adaptive",
+         scale="auto", smooth=False, startup=False, gc_mode="managed", alloc=False, pipeline=False,
+         latency=False, late_input=False):
+    start_audio()
+    if alloc:
+        tracemalloc.start()
+    # Keep ~10 minutes of frames when tracing, the last 5 s otherwise
+    trace_frames = FPS * 600 if trace else 600
+    scaler = RenderScaler(auto=True, smooth=smooth) if scale == "auto" else \
+        RenderScaler(float(scale), smooth=smooth)
+    gcm = GCManager() if gc_mode == "managed" else None
+    if late_input:
+        # Nothing but the handled types reaches the queue (no mouse motion, window events...)
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(Input.HANDLED))
+    if play:
+        log = InputLog.load(play)
+        game = Game(seed=log.seed, dirty=dirty, trace_frames=trace_frames, scaler=scaler,
+                    gc_manager=gcm, pipeline=pipeline, late_input=late_input)
+        # The recording's world size and stress level, whatever this display is
+        game.world = log.world()
+        if not game.pipeline:
+            game.world.timer = game.profiler
+        game.inp.replay = log
+    else:
+        seed = random.SystemRandom().randrange(2**31) if record else None
+        game = Game(seed=seed, stress=stress, dirty=dirty, trace_frames=trace_frames, scaler=scaler,
+                    gc_manager=gcm, pipeline=pipeline, late_input=late_input)
+        if record:
+            game.inp.log = InputLog(seed, WIDTH, HEIGHT, stress)
+    if latency:
+        game.inp.latency = LatencyMeter()
+    if trace or alloc:
+        game.profiler.count_surfaces = True
+        game.profiler.track_surfaces(True)
+    if gcm: gcm.start()
+    pacer = FramePacer(pace)
+    baseline = None
+    ticked = time.perf_counter()
+    while True:
+        # Long stalls (window drags, breakpoints) are capped by MAX_STEPS in Game.advance
+        fps = pacer.target(game.world)
+        if fps: game.scaler.budget_ms = 1000.0 / fps   # 0 means uncapped
+        if latency and fps:
+            # Spend the idle time draining the queue so events are stamped on arrival
+            game.inp.wait(ticked + 1.0 / fps - 0.002)
+        dt = clock.tick(fps) / 1000.0
+        ticked = time.perf_counter()
+        if not game.frame(dt) or startup:
+            break
+        if alloc and baseline is None and game.profiler.frames >= 2 * FPS:
+            baseline = take_alloc_snapshot()   # steady state: caches and pools are warm
+    if game.pipeline:
+        game.pipeline.close()
+        print(game.pipeline.report())
+    if startup:
+        print(f"time to first frame: {game.first_frame_ms:.1f} ms")
+    if stress:
+        p50, p95, p99, worst = game.profiler.summary(game.profiler.capacity)["frame"]
+        print(f"stress {stress}: frame p50 {p50:.2f} ms, p95 {p95:.2f} ms, "
+              f"p99 {p99:.2f} ms, worst {worst:.2f} ms")
+    if game.dirty:
+        print(game.dirty.report())
+    if gcm:
+        print(gcm.report())
+    if latency:
+        print(game.inp.latency.report())
+    if alloc and baseline is not None:
+        print("allocation growth since warm-up (top sites):")
+        for stat in take_alloc_snapshot().compare_to(baseline, "lineno")[:10]:
+            print(" ", stat)
+    game.profiler.track_surfaces(False)
+    if trace:
+        game.profiler.dump(trace)
+    if record:
+        game.inp.log.save(record, game.world)
+        print(f"recorded {len(game.inp.log)} steps (seed {game.inp.log.seed}) to {record}")
+    if play:
+        d = game.inp.diverged
+        print(f"replayed {game.inp.step}/{len(log)} steps: "
+              + ("OK" if d is None else f"DIVERGED at step {d}"))
+    pygame.quit(); sys.exit()
 
-        pygame.display.flip()
+def fast_replay(path):
+    """Replay an input log without rendering and report whether it matched."""
+    log = InputLog.load(path)
+    t = time.perf_counter()
+    world, diverged = replay(log)
+    print(f"replayed {len(log)} steps ({world.time:.1f}s sim) in {time.perf_counter() - t:.3f}s: "
+          + ("OK" if diverged is None else f"DIVERGED at step {diverged}"))
+    pygame.quit(); sys.exit(diverged is not None)
 
 if __name__ == "__main__":
+    import argparse
+    def render_scale(value):
+        if value == "auto":
+            return value
+        lo = min(RENDER_SCALES)
+        try:
+            k = float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected 'auto' or a number, got {value!r}")
+        if not lo <= k <= 1.0:
+            raise argparse.ArgumentTypeError(f"must be between {lo} and 1.0, got {value}")
+        return k
+    ap = argparse.ArgumentParser(description="Neon Dash")
+    ap.add_argument("--stress", type=int, default=0, metavar="N",
+                    help="keep N obstacles on screen and report frame times on exit")
+    ap.add_argument("--dirty", action="store_true",
+                    help="present only changed regions with display.update(rects)")
+    ap.add_argument("--trace", metavar="PATH",
+                    help="write per-frame phase timings to PATH (.csv or .json) on exit")
+    ap.add_argument("--pace", choices=("adaptive", "fixed"), default="adaptive",
+                    help=f"adaptive: display refresh rate, {BATTERY_FPS} FPS on battery; fixed: {FPS} FPS")
+    ap.add_argument("--render-scale", type=render_scale, default="auto", metavar="SCALE",
+                    help=f"draw the scene at SCALE ({min(RENDER_SCALES)}-1.0) of the display resolution, "
+                         "or 'auto' to adjust it to hold the frame rate")
+    ap.add_argument("--upscale", choices=("fast", "smooth"), default="fast",
+                    help="filter for upscaling a reduced render (smoothscale or scale)")
+    ap.add_argument("--startup", action="store_true",
+                    help="exit after the first frame and print the time to first frame")
+    ap.add_argument("--gc", choices=("managed", "auto"), default="managed",
+                    help="managed: freeze startup objects and collect only on idle frames; "
+                         "auto: Python's default collector")
+    ap.add_argument("--alloc", action="store_true",
+                    help="trace allocations: per-frame counts in the F3 overlay, top sites on exit")
+    ap.add_argument("--pipeline", action="store_true",
+                    help="simulate on a worker thread while the previous frame is drawn")
+    ap.add_argument("--latency", action="store_true",
+                    help="time control events to the physics step and to the flip; histograms on exit")
+    ap.add_argument("--late-input", action="store_true",
+                    help="queue only handled event types and re-read controls just before each physics step")
+    ap.add_argument("--record", metavar="LOG", help="record seed, inputs and frame times to LOG")
+    ap.add_argument("--replay", metavar="LOG", help="play back a recorded run in real time")
+    ap.add_argument("--fast", action="store_true",
+                    help="with --replay: simulate as fast as possible without rendering")
+    args = ap.parse_args()
     try:
-        main()
+        if args.replay and args.fast:
+            fast_replay(args.replay)
+        main(args.stress, args.dirty, args.trace, args.record, args.replay, args.pace,
+             args.render_scale, args.upscale == "smooth", args.startup, args.gc, args.alloc,
+             args.pipeline, args.latency, args.late_input)
     except Exception as e:
         print("Error:", e)
         print("If pygame isn't installed, run: pip install pygame")
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# Neon Dash — batched environment for agents and balancing sweeps.
+# VecEnv runs N independent episodes of the neon_sim rules as NumPy array
+# operations (one step advances every episode at once); evaluate() shards
+# episodes across a process pool and aggregates score/survival statistics.
+# Episodes play neon_sim.LevelGenerator levels (the validated waves and
+# pickups World spawns) drawn from a pool generated when the env is built.
+# Requires numpy; no pygame.
+
+import os, time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from neon_sim import (ACCEL_AIR, ACCEL_GROUND, COYOTE_TIME, FRICTION_AIR,
+                      FRICTION_GROUND, GRAVITY, HOVER_GRAV, HOVER_TIME,
+                      JUMP_BUFFER, JUMP_V, MAX_FALL, MAX_SPEED_X, NEAR_MISS,
+                      PICKUP_BOB, SIM_DT, TUNED_HZ, LevelGenerator)
+
+# Action bits; an action is any OR of these (so the action space is 0..15)
+LEFT, RIGHT, DOWN, JUMP = 1, 2, 4, 8
+N_ACTIONS = 16
+
+BLOCK, LASER, SPIKEBALL = 0, 1, 2
+SHIELD, SLOW, SCORE = 0, 1, 2
+KINDS = {"block": BLOCK, "laser": LASER, "spikeball": SPIKEBALL}
+PICKUPS = {"shield": SHIELD, "slow": SLOW, "score": SCORE}
+PLAYER_R = 16
+PICKUP_R = 10
+NEAREST = 4                      # obstacles described in each observation
+LEVEL_POOL = 256                 # level seeds the episodes of one VecEnv draw from
+LEVEL_CHUNKS = 2                 # chunks of each pooled level generated up front
+OBS_SIZE = 6 + NEAREST * 5
+
+class VecEnv:
+    """``n`` Neon Dash episodes stepped together with gym-style semantics.
+
+    ``step(actions)`` takes one action per episode and returns
+    ``(obs, reward, done, info)``; finished episodes are reset automatically
+    and ``info["final_score"]`` / ``info["final_time"]`` hold their results
+    (NaN for episodes that did not finish this step). Episodes longer than
+    ``max_steps`` are cut off and flagged in ``info["truncated"]``.
+    Each episode plays one of ``level_pool`` levels; their opening chunks
+    are generated in the constructor, later ones once per level as the
+    first episode reaches them.
+    """
+    def __init__(self, n, width=1920, height=1080, dt=SIM_DT, seed=None,
+                 max_steps=36000, max_obstacles=32, max_pickups=4, level_pool=LEVEL_POOL):
+        self.n, self.width, self.height, self.dt = n, width, height, dt
+        self.ground_y = int(height * 0.8)
+        # Per-step friction factors (ground, air), scaled from the TUNED_HZ values to this dt
+        self.friction = (FRICTION_GROUND ** (dt * TUNED_HZ), FRICTION_AIR ** (dt * TUNED_HZ))
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+        f = lambda: np.zeros(n)
+        b = lambda: np.zeros(n, bool)
+        # Player
+        self.x, self.y, self.vx, self.vy = f(), f(), f(), f()
+        self.coyote, self.jump_buffer, self.hover = f(), f(), f()
+        self.shield, self.slowmo, self.combo_time, self.combo = f(), f(), f(), f()
+        self.combo_charge = f()
+        self.on_ground, self.prev_jump = b(), b()
+        # Run
+        self.t, self.score, self.speed = f(), f(), f()
+        # Levels: the pooled generators and their chunks so far; per episode
+        # its level, next chunk, pending spawns (latest first) and next spawn time
+        self.levels = [LevelGenerator(int(s), width, height) for s in self.rng.integers(2**32, size=level_pool)]
+        self.chunks = [[level.next() for _ in range(LEVEL_CHUNKS)] for level in self.levels]
+        self.level, self.chunk = np.zeros(n, np.int64), np.zeros(n, np.int64)
+        self.due = [[] for _ in range(n)]
+        self.next_t = np.full(n, np.inf)
+        self.steps = np.zeros(n, np.int64)
+        # Obstacle and pickup slots
+        k, p = max_obstacles, max_pickups
+        self.o_alive = np.zeros((n, k), bool)
+        self.o_kind = np.zeros((n, k), np.int8)
+        self.ox, self.oy, self.ow, self.oh, self.obase, self.ospeed, self.ophase = (
+            np.zeros((n, k)) for _ in range(7))
+        self.p_alive = np.zeros((n, p), bool)
+        self.p_kind = np.zeros((n, p), np.int8)
+        self.px, self.py, self.pbase, self.pspeed, self.pphase = (np.zeros((n, p)) for _ in range(5))
+        self.rows = np.arange(n)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset(np.ones(self.n, bool))
+        return self.observe()
+
+    def _reset(self, m):
+        self.x[m] = self.width * 0.2
+        self.y[m] = self.height * 0.7
+        for a in (self.vx, self.vy, self.coyote, self.jump_buffer, self.hover,
+                  self.shield, self.slowmo, self.combo_time, self.combo, self.combo_charge,
+                  self.t, self.score):
+            a[m] = 0.0
+        self.on_ground[m] = False
+        self.prev_jump[m] = False
+        self.speed[m] = 240.0
+        self.steps[m] = 0
+        self.o_alive[m] = False
+        self.p_alive[m] = False
+        idx = np.flatnonzero(m)
+        self.level[idx] = self.rng.integers(len(self.levels), size=len(idx))
+        self.chunk[idx] = 0
+        for i in idx:
+            self.due[i] = []
+            self._refill(i)
+
+    def _refill(self, i):
+        due, chunks = self.due[i], self.chunks[self.level[i]]
+        while not due:
+            k = self.chunk[i]
+            if k == len(chunks):
+                chunks.append(self.levels[self.level[i]].next())
+            due.extend(reversed(chunks[k].spawns))
+            self.chunk[i] = k + 1
+        self.next_t[i] = due[-1][0]
+
+    def step(self, actions):
+        a = np.asarray(actions, np.int64)
+        left, right, down, jump = (a & LEFT) != 0, (a & RIGHT) != 0, (a & DOWN) != 0, (a & JUMP) != 0
+        pressed = jump & ~self.prev_jump
+        released = ~jump & self.prev_jump
+        self.prev_jump = jump
+        dt = self.dt
+        score0 = self.score.copy()
+
+        self.t += dt
+        self.steps += 1
+        difficulty = 1.0 + np.minimum(2.5, self.t / 45.0)
+        self.speed += dt * (10.0 + difficulty*6.0)
+        self.score += dt * (10.0 * difficulty) * (1 + 0.1*self.combo)
+        spawn = self.next_t <= self.t
+        if spawn.any():
+            self._spawn(np.flatnonzero(spawn))
+
+        self._update_player(left, right, down, jump, pressed, released)
+        t = self.t[:, None]
+        self.ox -= self.ospeed * dt
+        swing = np.where(self.o_kind == LASER, np.sin(self.ophase + t*2.0)*30,
+                         np.where(self.o_kind == SPIKEBALL, np.sin(self.ophase + t*4.0)*50, 0.0))
+        self.oy = np.where(self.o_kind == BLOCK, self.oy, self.obase + swing)
+        self.o_alive &= self.ox + self.ow >= -120
+        self.px -= self.pspeed * dt
+        self.py = self.pbase + np.sin(self.pphase + t*3.0) * PICKUP_BOB
+        self.p_alive &= self.px >= -50
+
+        dead = self._collide()
+        reward = self.score - score0
+        truncated = self.steps >= self.max_steps
+        done = dead | truncated
+        final_score = np.where(done, self.score, np.nan)
+        final_time = np.where(done, self.t, np.nan)
+        if done.any():
+            self._reset(done)
+        info = {"final_score": final_score, "final_time": final_time,
+                "truncated": truncated & ~dead}
+        return self.observe(), reward, done, info
+
+    def _spawn(self, idx):
+        """Move every level spawn that is due into a free slot (dropped when the slots are full)."""
+        base_x = self.width + 30
+        for i in idx:
+            due, now, speed = self.due[i], self.t[i], self.speed[i]
+            while due[-1][0] <= now:
+                _, kind, dx, y, w, h, factor, phase = due.pop()
+                if kind in PICKUPS:
+                    c = np.argmin(self.p_alive[i])
+                    if not self.p_alive[i, c]:
+                        self.p_alive[i, c] = True
+                        self.p_kind[i, c] = PICKUPS[kind]
+                        self.px[i, c], self.py[i, c], self.pbase[i, c] = base_x + dx, y, y
+                        self.pspeed[i, c], self.pphase[i, c] = speed * factor, phase
+                else:
+                    c = np.argmin(self.o_alive[i])
+                    if not self.o_alive[i, c]:
+                        self.o_alive[i, c] = True
+                        self.o_kind[i, c] = KINDS[kind]
+                        self.ox[i, c], self.oy[i, c], self.obase[i, c] = base_x + dx, y, y
+                        self.ow[i, c], self.oh[i, c] = w, h
+                        self.ospeed[i, c], self.ophase[i, c] = speed * factor, phase
+                if not due:
+                    self._refill(i)
+            self.next_t[i] = due[-1][0]
+
+    def _update_player(self, left, right, down, jump, pressed, released):
+        dt = self.dt
+        ldt = dt * np.where(self.slowmo > 0, 0.5, 1.0)
+        self.coyote = np.maximum(0.0, self.coyote - ldt)
+        self.jump_buffer = np.maximum(0.0, self.jump_buffer - ldt)
+        self.hover = np.maximum(0.0, self.hover - ldt)
+        self.slowmo = np.maximum(0.0, self.slowmo - ldt)
+        self.shield = np.maximum(0.0, self.shield - ldt)
+        self.jump_buffer = np.where(pressed, JUMP_BUFFER, self.jump_buffer)
+
+        g = self.on_ground
+        accel = np.where(g, ACCEL_GROUND, ACCEL_AIR)
+        self.vx += (right.astype(float) - left) * accel * ldt
+        self.vx = np.clip(self.vx, -MAX_SPEED_X, MAX_SPEED_X) * np.where(g, self.friction[0], self.friction[1])
+
+        jumped = (self.jump_buffer > 0) & (g | (self.coyote > 0.0))
+        self.vy = np.where(jumped, JUMP_V, self.vy)
+        g = g & ~jumped
+        self.coyote = np.where(jumped, 0.0, self.coyote)
+        self.jump_buffer = np.where(jumped, 0.0, self.jump_buffer)
+        self.hover = np.where(jumped, HOVER_TIME, self.hover)
+
+        self.vy = np.where(released & (self.vy < -140), -140.0, self.vy)
+        self.vy += np.where(jump & ~g & (self.hover > 0), (HOVER_GRAV - GRAVITY) * ldt, 0.0)
+        self.vy += np.where(down & ~g, GRAVITY * ldt * 0.8, 0.0)
+        self.vy = np.minimum(self.vy + GRAVITY * ldt, MAX_FALL)
+        self.x += self.vx * ldt
+        self.y += self.vy * ldt
+
+        landed = self.y + PLAYER_R >= self.ground_y
+        self.coyote = np.where(landed | (g & (self.vy > 0)), COYOTE_TIME, self.coyote)
+        self.y = np.where(landed, self.ground_y - PLAYER_R, self.y)
+        self.vy = np.where(landed, 0.0, self.vy)
+        self.on_ground = landed
+
+        self.combo_time = np.maximum(0.0, self.combo_time - dt)
+        self.combo = np.where(self.combo_time <= 0, 0.0, self.combo)
+        self.combo_charge = np.where(self.combo_time <= 0, 0.0, self.combo_charge)
+
+    def _collide(self):
+        px, py = self.x[:, None], self.y[:, None]
+        cx = np.clip(px, self.ox, self.ox + self.ow)
+        cy = np.clip(py, self.oy, self.oy + self.oh)
+        hit = self.o_alive & ((px-cx)**2 + (py-cy)**2 <= PLAYER_R*PLAYER_R)
+        hits = hit.sum(1)
+        shielded = self.shield > 0
+        # A shield absorbs the first hit (and destroys that obstacle); any
+        # other hit in the same step is fatal, as in World._collide
+        absorb = shielded & (hits > 0)
+        first = np.argmax(hit, axis=1)
+        self.o_alive[self.rows[absorb], first[absorb]] = False
+        self.shield[absorb] = 0.0
+        dead = (hits > 0) & ~shielded | (hits > 1)
+
+        dx = np.maximum(np.maximum(self.ox - px, 0), px - (self.ox + self.ow))
+        dy = np.maximum(np.maximum(self.oy - py, 0), py - (self.oy + self.oh))
+        near = (self.o_alive & ~hit & (dx*dx + dy*dy < (PLAYER_R + NEAR_MISS)**2)).any(1)
+        streak = near & (self.combo_time > 0)
+        self.combo_charge = np.where(streak, self.combo_charge + self.dt * TUNED_HZ, np.where(near, 0.0, self.combo_charge))
+        gained = np.floor(self.combo_charge + 1e-6)
+        self.combo = np.where(streak, np.minimum(20, self.combo + gained), np.where(near, 1.0, self.combo))
+        self.combo_charge -= np.where(streak, gained, 0.0)
+        self.combo_time = np.where(near, 1.2, self.combo_time)
+
+        cx = np.clip(px, self.px - PICKUP_R, self.px + PICKUP_R)
+        cy = np.clip(py, self.py - PICKUP_R, self.py + PICKUP_R)
+        got = self.p_alive & ((px-cx)**2 + (py-cy)**2 <= PLAYER_R*PLAYER_R)
+        if got.any():
+            self.p_alive &= ~got
+            self.shield = np.where((got & (self.p_kind == SHIELD)).any(1), 6.0, self.shield)
+            self.slowmo = np.where((got & (self.p_kind == SLOW)).any(1), 2.1, self.slowmo)
+            self.score += (got & (self.p_kind == SCORE)).sum(1) * (80 + 10*self.combo)
+        return dead
+
+    def observe(self):
+        """Float32 ``(n, OBS_SIZE)``: player state then the nearest obstacles ahead.
+
+        Each obstacle is ``(dx/width, (y-ground)/height, w/width, h/height,
+        kind/2)``; empty entries are ``(1, 0, 0, 0, 0)``.
+        """
+        obs = np.zeros((self.n, OBS_SIZE), np.float32)
+        obs[:, 0] = (self.y - self.ground_y) / self.height
+        obs[:, 1] = self.vy / 1000.0
+        obs[:, 2] = self.on_ground
+        obs[:, 3] = self.shield > 0
+        obs[:, 4] = self.slowmo > 0
+        obs[:, 5] = self.speed / 1000.0
+        ahead = self.o_alive & (self.ox + self.ow > self.x[:, None] - PLAYER_R)
+        key = np.where(ahead, self.ox, np.inf)
+        near = np.argsort(key, axis=1)[:, :NEAREST]
+        rows = self.rows[:, None]
+        valid = ahead[rows, near]
+        feats = np.stack([
+            np.where(valid, (self.ox[rows, near] - self.x[:, None]) / self.width, 1.0),
+            np.where(valid, (self.oy[rows, near] - self.ground_y) / self.height, 0.0),
+            np.where(valid, self.ow[rows, near] / self.width, 0.0),
+            np.where(valid, self.oh[rows, near] / self.height, 0.0),
+            np.where(valid, self.o_kind[rows, near] / 2.0, 0.0),
+        ], axis=2)
+        obs[:, 6:] = feats.reshape(self.n, -1)
+        return obs
+
+# Built-in policies (module level so they pickle into worker processes)
+
+def noop_policy(obs):
+    return np.zeros(len(obs), np.int64)
+
+def random_policy(obs):
+    """Uniform random actions from the global NumPy state (seeded per shard by evaluate)."""
+    return np.random.randint(0, N_ACTIONS, len(obs))
+
+def hop_policy(obs):
+    """Jump at a low block close ahead and hold jump while rising."""
+    dx, top, kind = obs[:, 6], obs[:, 7], obs[:, 10]
+    grounded = obs[:, 2] > 0
+    hop = grounded & (kind == BLOCK) & (dx > 0) & (dx < 0.08) & (top > -0.08)
+    rising = ~grounded & (obs[:, 1] < 0)
+    return np.where(hop | rising, JUMP, 0)
+
+def _rollout(policy, episodes, n_envs, seed, env_kwargs):
+    # Forked workers inherit one global NumPy state; reseed so each shard's random_policy differs
+    np.random.seed(seed)
+    env = VecEnv(n_envs, seed=seed, **env_kwargs)
+    obs = env.reset()
+    quota = -(-episodes // n_envs)
+    finished = np.zeros(n_envs, np.int64)
+    scores, times = [], []
+    steps = 0
+    while (finished < quota).any():
+        obs, _, done, info = env.step(policy(obs))
+        steps += n_envs
+        take = done & (finished < quota)
+        if take.any():
+            scores.append(info["final_score"][take])
+            times.append(info["final_time"][take])
+        finished += done
+    return np.concatenate(scores)[:episodes], np.concatenate(times)[:episodes], steps
+
+def evaluate(policy=hop_policy, episodes=1024, n_envs=256, workers=None, seed=0, **env_kwargs):
+    """Run ``episodes`` episodes sharded across a process pool; return summary stats.
+
+    Each worker owns a VecEnv of ``n_envs`` episodes seeded ``seed + shard``.
+    ``policy`` maps an observation batch to an action batch and must be
+    picklable (a module-level function).
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = [episodes // workers + (i < episodes % workers) for i in range(workers)]
+    shards = [s for s in shards if s]
+    t = time.perf_counter()
+    if len(shards) == 1:
+        results = [_rollout(policy, shards[0], min(n_envs, shards[0]), seed, env_kwargs)]
+    else:
+        with ProcessPoolExecutor(len(shards)) as pool:
+            results = list(pool.map(_rollout, [policy]*len(shards), shards,
+                                    [min(n_envs, s) for s in shards],
+                                    [seed + i for i in range(len(shards))],
+                                    [env_kwargs]*len(shards)))
+    wall = time.perf_counter() - t
+    scores = np.concatenate([r[0] for r in results])
+    times = np.concatenate([r[1] for r in results])
+    steps = sum(r[2] for r in results)
+    return {
+        "episodes": len(scores),
+        "workers": len(shards),
+        "score_mean": float(scores.mean()),
+        "score_std": float(scores.std()),
+        "score_p50": float(np.percentile(scores, 50)),
+        "score_p95": float(np.percentile(scores, 95)),
+        "score_max": float(scores.max()),
+        "survival_mean": float(times.mean()),
+        "survival_p95": float(np.percentile(times, 95)),
+        "env_steps": steps,
+        "wall": wall,
+        "steps_per_sec": steps / wall,
+    }
+
+if __name__ == "__main__":
+    import argparse, json
+    policies = {"noop": noop_policy, "random": random_policy, "hop": hop_policy}
+    ap = argparse.ArgumentParser(description="Batch-evaluate a Neon Dash policy.")
+    ap.add_argument("--policy", choices=sorted(policies), default="hop")
+    ap.add_argument("--episodes", type=int, default=4096)
+    ap.add_argument("--envs", type=int, default=256, help="episodes stepped together per worker")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    stats = evaluate(policies[args.policy], args.episodes, args.envs, args.workers, args.seed)
+    print(json.dumps(stats, indent=2))
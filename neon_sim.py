@@ -0,0 +1,836 @@
+#!/usr/bin/env python3
+# Neon Dash — headless simulation core.
+# Pure game rules: no pygame, no wall clock, no global random state.
+# The world advances only through World.step(controls, dt) and draws every
+# random number from its own seeded RNG, so the same seed and input stream
+# always reproduce the same run. Sounds and particle bursts are emitted as
+# events for a front end (neon_dash.py) to present.
+
+import math, random, struct, sys, time, zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from operator import attrgetter
+
+SIM_HZ = 240              # fixed physics rate of the game; the default for headless runs
+SIM_DT = 1.0 / SIM_HZ
+TUNED_HZ = 120            # step rate the per-step friction and streak rules were tuned at
+
+# Player physics (pixels and seconds); shared with the batched port in neon_env
+ACCEL_GROUND = 1400
+ACCEL_AIR = 900
+MAX_SPEED_X = 260
+FRICTION_GROUND = 0.86
+FRICTION_AIR = 0.98
+JUMP_V = -420
+GRAVITY = 1200
+MAX_FALL = 950
+HOVER_GRAV = 300
+JUMP_BUFFER = 0.12
+COYOTE_TIME = 0.12
+HOVER_TIME = 0.18
+NEAR_MISS = 12            # extra radius that counts as a near miss
+PICKUP_BOB = 8.0          # pickup bob amplitude (px), independent of the step rate
+
+PATTERNS = ["block", "laser", "spike", "stack", "mix"]
+RICH_PATTERNS = ["gauntlet"]      # multi-hazard waves, only offered past RICH_DIFFICULTY
+RICH_DIFFICULTY = 2.0
+PICKUP_KINDS = ("shield", "slow", "score")
+CHUNK_SECONDS = 4.0               # simulated time covered by one generated chunk
+
+_by_x = attrgetter("x")
+
+class Controls:
+    """Per-frame input state the simulation reads (level and edge flags)."""
+    def __init__(self):
+        self.reset()
+    def reset(self):
+        self.left = self.right = self.down = False
+        self.jump = False
+        self.jump_pressed = False
+        self.jump_released = False
+        self.pause_pressed = False
+        self.restart_pressed = False
+        self.quit_pressed = False
+    def clear_edges(self):
+        self.jump_pressed = False
+        self.jump_released = False
+        self.pause_pressed = False
+        self.restart_pressed = False
+        self.quit_pressed = False
+    def press_jump(self):
+        if not self.jump:
+            self.jump_pressed = True
+        self.jump = True
+    def release_jump(self):
+        if self.jump:
+            self.jump_released = True
+        self.jump = False
+
+def aabb_circle_collision(rect, cx, cy, cr):
+    rx, ry, rw, rh = rect
+    closest_x = max(rx, min(cx, rx + rw))
+    closest_y = max(ry, min(cy, ry + rh))
+    dx = cx - closest_x
+    dy = cy - closest_y
+    return dx*dx + dy*dy <= cr*cr
+
+class Player:
+    def __init__(self, width, height):
+        self.reset(width, height)
+    def reset(self, width, height):
+        self.x = width * 0.2
+        self.y = height * 0.7
+        self.px, self.py = self.x, self.y   # position before the last step, for render interpolation
+        self.vx = 0.0
+        self.vy = 0.0
+        self.r = 16
+        self.on_ground = False
+        self.coyote = 0.0          # time after falling where jump is allowed
+        self.jump_buffer = 0.0     # time before landing where jump is queued
+        self.hover = 0.0
+        self.shield = 0.0
+        self.slowmo = 0.0
+        self.combo_time = 0.0
+        self.combo = 0
+        self.combo_charge = 0.0    # streak growth owed while a near miss lasts (TUNED_HZ per second)
+        self.alive = True
+    def update(self, inp, dt, ground_y, events):
+        # Slow-mo halves dt for the player only (world still moves — feels powerful)
+        local_dt = dt * (0.5 if self.slowmo > 0 else 1.0)
+        self.px, self.py = self.x, self.y
+
+        # Timers
+        self.coyote = max(0.0, self.coyote - local_dt)
+        self.jump_buffer = max(0.0, self.jump_buffer - local_dt)
+        self.hover = max(0.0, self.hover - local_dt)
+        self.slowmo = max(0.0, self.slowmo - local_dt)
+        self.shield = max(0.0, self.shield - local_dt) if self.shield>0 else 0.0
+
+        # Queue jump on press
+        if inp.jump_pressed:
+            self.jump_buffer = JUMP_BUFFER
+
+        # Horizontal
+        ax = 0.0
+        if inp.left: ax -= (ACCEL_AIR if not self.on_ground else ACCEL_GROUND)
+        if inp.right: ax += (ACCEL_AIR if not self.on_ground else ACCEL_GROUND)
+        self.vx += ax * local_dt
+        # Clamp & friction
+        self.vx = max(-MAX_SPEED_X, min(MAX_SPEED_X, self.vx))
+        self.vx *= (FRICTION_GROUND if self.on_ground else FRICTION_AIR) ** (dt * TUNED_HZ)
+
+        # Jump if buffered and allowed (ground or coyote)
+        if self.jump_buffer > 0 and (self.on_ground or self.coyote > 0.0):
+            self.vy = JUMP_V
+            self.on_ground = False
+            self.coyote = 0.0
+            self.jump_buffer = 0.0
+            self.hover = HOVER_TIME
+            events.append(("beep", 620, 70, 0.25))
+
+        # Variable jump height: early release trims upward velocity
+        if inp.jump_released and self.vy < -140:
+            self.vy = -140
+
+        # Hover (hold jump briefly after the jump)
+        if inp.jump and not self.on_ground and self.hover > 0:
+            self.vy += (HOVER_GRAV - GRAVITY) * local_dt
+
+        # Fast fall
+        if inp.down and not self.on_ground:
+            self.vy += GRAVITY * local_dt * 0.8
+
+        # Gravity
+        self.vy += GRAVITY * local_dt
+        if self.vy > MAX_FALL: self.vy = MAX_FALL
+
+        # Integrate
+        self.x += self.vx * local_dt
+        self.y += self.vy * local_dt
+
+        # Ground collision
+        if self.y + self.r >= ground_y:
+            if not self.on_ground and self.vy > 200:
+                events.append(("beep", 220, 40, 0.15))
+            self.y = ground_y - self.r
+            self.vy = 0.0
+            self.on_ground = True
+            self.coyote = COYOTE_TIME
+        else:
+            # left the ground
+            if self.on_ground and self.vy > 0:
+                self.coyote = COYOTE_TIME
+            self.on_ground = False
+
+        # Combo timer
+        self.combo_time = max(0.0, self.combo_time - dt)
+        if self.combo_time <= 0 and self.combo > 0:
+            self.combo = 0
+            self.combo_charge = 0.0
+
+class Obstacle:
+    __slots__ = ("kind", "x", "y", "px", "py", "w", "h", "base_y", "speed", "phase", "alive")
+    def __init__(self, kind, x, y, w, h, speed, phase):
+        self.init(kind, x, y, w, h, speed, phase)
+    def init(self, kind, x, y, w, h, speed, phase):
+        self.kind = kind
+        self.x, self.y, self.w, self.h = x, y, w, h
+        self.px, self.py = x, y
+        self.base_y = y
+        self.speed = speed
+        self.phase = phase
+        self.alive = True
+    def update(self, dt, t):
+        self.px, self.py = self.x, self.y
+        self.x -= self.speed * dt
+        if self.kind == "laser":
+            self.y = self.base_y + math.sin(self.phase + t*2.0)*30
+        elif self.kind == "spikeball":
+            self.y = self.base_y + math.sin(self.phase + t*4.0)*50
+        if self.x + self.w < -120:
+            self.alive = False
+    def rect(self):
+        return (self.x, self.y, self.w, self.h)
+
+class Pickup:
+    __slots__ = ("kind", "x", "y", "px", "py", "base_y", "speed", "r", "alive", "phase")
+    R = 10
+    def __init__(self, kind, x, y, speed, phase):
+        self.init(kind, x, y, speed, phase)
+    def init(self, kind, x, y, speed, phase):
+        self.kind = kind
+        self.x, self.y = x, y
+        self.px, self.py = x, y
+        self.base_y = y
+        self.speed = speed
+        self.r = self.R
+        self.alive = True
+        self.phase = phase
+    def update(self, dt, t):
+        self.px, self.py = self.x, self.y
+        self.x -= self.speed * dt
+        self.y = self.base_y + math.sin(self.phase + t*3.0) * PICKUP_BOB
+        if self.x < -50: self.alive = False
+    def rect(self):
+        return (self.x-self.r, self.y-self.r, self.r*2, self.r*2)
+
+class Pool:
+    """Recycling storage for one entity type.
+
+    ``active`` is the live list the game iterates; ``spawn`` re-initializes a
+    released instance when one is available, so steady-state spawning and
+    despawning allocate nothing. ``compact`` drops dead entries in place and
+    keeps the survivors' order (the collision broad phase relies on the
+    list staying nearly sorted by x).
+    """
+    def __init__(self, cls):
+        self.cls = cls
+        self.active = []
+        self.free = []
+    def spawn(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.init(*args)
+        else:
+            obj = self.cls(*args)
+        self.active.append(obj)
+        return obj
+    def compact(self):
+        active, j = self.active, 0
+        for obj in active:
+            if obj.alive:
+                active[j] = obj
+                j += 1
+            else:
+                self.free.append(obj)
+        del active[j:]
+    def release_all(self):
+        self.free.extend(self.active)
+        self.active.clear()
+
+def make_wave(rng, pattern, ground_y, height):
+    """Obstacles of one spawn pattern as ``(kind, dx, y, w, h, speed_factor, phase)`` tuples."""
+    out = []
+    def add(kind, dx, y, w, h, factor=1.0):
+        out.append((kind, dx, y, w, h, factor, rng.random()*6.28))
+    if pattern == "block":
+        h = rng.randint(16, 60)
+        add("block", 0, ground_y - h, rng.randint(24, 48), h)
+    elif pattern == "laser":
+        h = rng.randint(12, 20)
+        y = rng.randint(int(height*0.45), ground_y-60)
+        add("laser", 0, y, rng.randint(80, 140), h, 1.1)
+    elif pattern == "spike":
+        sz = rng.randint(22, 34)
+        y = rng.randint(int(height*0.45), ground_y-40)
+        add("spikeball", 0, y, sz, sz, 1.05)
+    elif pattern == "stack":
+        step = rng.randint(18, 28)
+        for i in range(rng.randint(2,4)):
+            h = step*(i+1)
+            add("block", i*48, ground_y - h, 36, h)
+    elif pattern == "mix":
+        h = rng.randint(16, 48)
+        add("block", 0, ground_y - h, rng.randint(24, 48), h)
+        sz = rng.randint(20, 28)
+        add("spikeball", 120, rng.randint(int(height*0.45), ground_y-60), sz, sz, 1.05)
+    else:   # gauntlet: low blocks spaced for back-to-back hops
+        dx = 0
+        for _ in range(rng.randint(2, 3)):
+            h = rng.randint(16, 40)
+            add("block", dx, ground_y - h, rng.randint(24, 36), h)
+            dx += rng.randint(180, 260)
+    return out
+
+def difficulty_at(t):
+    return 1.0 + min(2.5, t / 45.0)
+
+def speed_at(t):
+    """World.speed ``t`` seconds into a run (closed form of the ramp in World._spawn)."""
+    ramp = min(t, 112.5)
+    return 240.0 + 16.0*ramp + ramp*ramp/15.0 + 31.0*(t - ramp)
+
+class Chunk:
+    """One generated stretch of a run: spawns sorted by time, plus how many waves were rejected.
+
+    Each spawn is ``(t, kind, dx, y, w, h, speed_factor, phase)``: ``kind`` is an
+    obstacle kind or a PICKUP_KINDS entry, ``dx`` the offset right of the spawn edge.
+    """
+    __slots__ = ("index", "spawns", "rejected")
+    def __init__(self, index, spawns, rejected):
+        self.index, self.spawns, self.rejected = index, spawns, rejected
+
+class LevelGenerator:
+    """Seeded, validated obstacle and pickup placements for one run.
+
+    Waves are grouped into Chunks of CHUNK_SECONDS. ``build(until)`` works
+    ahead until a perf_counter deadline and ``next()`` returns the next
+    chunk; the output depends only on the seed. A wave is kept if one of
+    POLICIES survives it together with the wave before it.
+    """
+    AHEAD = 2
+    REROLLS = 3
+    # (lead as a fraction of the speed, seconds the jump is held), in the
+    # order that clears the most sampled waves first
+    POLICIES = ((0.55, 0.5), (0.15, 0.5), (0.4, 0.5), (0.4, 0.2),
+                (0.55, 0.2), (0.3, 0.5), (0.1, 0.5), (0.25, 0.2))
+    DT = 1 / 60                   # validation step; coarse, so the player is padded by MARGIN
+    MARGIN = 2
+    _bands = {}                   # (width, height) -> reachable pickup y range
+
+    def __init__(self, seed, width, height):
+        self.width, self.height = width, height
+        self.ground_y = int(height * 0.8)
+        self.spawn_x = width + 30
+        self.player_x = width * 0.2
+        self.rng = random.Random(seed)
+        self.t = 0.0                # time of the next wave
+        self.prev, self.prev_t = [], 0.0
+        self.pickup_t = 2.0
+        self.index = 0
+        self.spawns = []
+        self.rejected = 0
+        self.ready = deque()
+        self.pickup_band = self._bands.get((width, height)) or self._pickup_band()
+        self.work = self._generate()
+
+    def _grounded_player(self):
+        p = Player(self.width, self.height)
+        p.y = self.ground_y - p.r
+        p.on_ground = True
+        return p
+
+    def _pickup_band(self):
+        # Highest point a fully held jump reaches; pickups stay in reach even at the top of their bob
+        p, c, events = self._grounded_player(), Controls(), []
+        c.press_jump()
+        top = p.y
+        for _ in range(480):
+            p.update(c, 1 / 240, self.ground_y, events)
+            c.clear_edges()
+            top = min(top, p.y)
+        lo = max(int(self.height*0.35), math.ceil(top - p.r - Pickup.R + PICKUP_BOB))
+        band = self._bands[self.width, self.height] = (min(lo, self.ground_y - 80), self.ground_y - 80)
+        return band
+
+    def clears(self, wave, t):
+        """True if some jump policy takes the player past every obstacle of ``wave`` spawned at ``t``."""
+        check = self._clears(wave, t)
+        try:
+            while True:
+                next(check)
+        except StopIteration as done:
+            return done.value
+
+    def _clears(self, wave, t):
+        # Generator form of clears(): yields after each simulated policy
+        low = self.ground_y - 32    # hazards reaching below a standing player's head
+        swing = {"laser": 30, "spikeball": 50}
+        if all(y + h + swing.get(kind, 0) < low for kind, _, y, _, h, _, _ in wave):
+            return True             # nothing reaches the ground lane: standing still is safe
+        speed = speed_at(t)
+        # Skip ahead to just before the longest lead can trigger a jump
+        arrive = min((self.spawn_x + dx - self.player_x - 16) / (speed * f)
+                     for _, dx, _, _, _, f, _ in wave)
+        skip = max(0.0, arrive - 0.7)
+        for lead, hold in self.POLICIES:
+            ok = self._survives(wave, t, speed, skip, (speed * lead, hold))
+            yield
+            if ok:
+                return True
+        return False
+
+    def _survives(self, wave, t0, speed, skip, policy):
+        # Obstacles as [x, y, w, h, vx, base_y, rate, amplitude, phase], moved like Obstacle.update
+        motion = {"laser": (2.0, 30), "spikeball": (4.0, 50)}
+        obstacles = []
+        for kind, dx, y, w, h, f, phase in wave:
+            rate, amp = motion.get(kind, (0.0, 0))
+            obstacles.append([self.spawn_x + dx - speed*f*skip, y, w, h, speed*f, y, rate, amp, phase])
+        p, c, events = self._grounded_player(), Controls(), []
+        r2, held, t, dt = (p.r + self.MARGIN) ** 2, 0.0, skip, self.DT
+        reach = p.r + self.MARGIN
+        lead, hold = policy
+        low = self.ground_y - 2*p.r
+        ground_y = self.ground_y
+        while obstacles:
+            c.clear_edges()
+            if p.on_ground and not c.jump:
+                front = p.x + p.r
+                for ob in obstacles:
+                    if ob[1] + ob[3] > low and 0 <= ob[0] - front <= lead:
+                        c.press_jump()
+                        held = 0.0
+                        break
+            elif c.jump:
+                held += dt
+                if held >= hold:
+                    c.release_jump()
+            t += dt
+            # Standing still with nothing queued leaves the player unchanged, so skip the update
+            if not (p.on_ground and not c.jump and not p.jump_buffer and not p.vx):
+                p.update(c, dt, ground_y, events)
+            px, py, tail = p.x, p.y, p.x - p.r
+            near, far = px - reach, px + reach
+            now = t0 + t
+            for ob in obstacles:
+                ob[0] -= ob[4] * dt
+                if ob[7]:
+                    ob[1] = ob[5] + math.sin(ob[8] + now*ob[6]) * ob[7]
+                x, y = ob[0], ob[1]
+                if x > far or x + ob[2] < near:
+                    continue
+                ddx = x - px if x > px else (px - x - ob[2] if px > x + ob[2] else 0.0)
+                ddy = y - py if y > py else (py - y - ob[3] if py > y + ob[3] else 0.0)
+                if ddx*ddx + ddy*ddy <= r2:
+                    return False
+            obstacles = [ob for ob in obstacles if ob[0] + ob[2] >= tail]
+        return True
+
+    def _generate(self):
+        """Endless generator producing the level; yields after every unit of work (one policy check)."""
+        rng = self.rng
+        while True:
+            end = (self.index + 1) * CHUNK_SECONDS
+            while self.t < end:
+                t = self.t
+                d = difficulty_at(t)
+                pool = PATTERNS if d > 1.2 else PATTERNS[:2]
+                if d > RICH_DIFFICULTY:
+                    pool = pool + RICH_PATTERNS
+                # Checked together with the previous wave, re-expressed as spawning
+                # with it further right, so the gap between them is fair too
+                lag = speed_at(t) * (t - self.prev_t)
+                for _ in range(self.REROLLS):
+                    wave = make_wave(rng, rng.choice(pool), self.ground_y, self.height)
+                    later = [(k, dx + lag*f, y, w, h, f, ph) for k, dx, y, w, h, f, ph in wave]
+                    if (yield from self._clears(self.prev + later, self.prev_t)):
+                        break
+                    self.rejected += 1
+                else:
+                    wave = None     # nothing fair fits this slot: leave it empty
+                    # A previous wave that is only beatable from its own approach would
+                    # reject every follower; stop chaining from it
+                    if not (yield from self._clears(self.prev, self.prev_t)):
+                        self.prev = []
+                if wave:
+                    self.spawns.extend((t, *ob) for ob in wave)
+                    self.prev, self.prev_t = wave, t
+                sr = 1.15 / d
+                self.t += rng.uniform(max(0.32, 0.9*sr), 1.05*sr)
+            while self.pickup_t < end:
+                d = difficulty_at(self.pickup_t)
+                kind = rng.choices(PICKUP_KINDS, weights=[1.2, 1.0, 1.4])[0]
+                y = rng.randint(*self.pickup_band)
+                self.spawns.append((self.pickup_t, kind, -10, y, 0, 0, 0.9, rng.random()*6.28))
+                self.pickup_t += rng.uniform(3.0/d, 6.0/d)
+            self.spawns.sort(key=lambda s: s[0])
+            self.ready.append(Chunk(self.index, self.spawns, self.rejected))
+            self.index += 1
+            self.spawns, self.rejected = [], 0
+            yield
+
+    def build(self, until=None, ahead=AHEAD):
+        """Generate until ``ahead`` chunks are queued or perf_counter passes ``until``; True when done."""
+        while len(self.ready) < ahead:
+            if until is not None and time.perf_counter() >= until:
+                return False
+            next(self.work)
+        return True
+
+    def next(self):
+        """The next chunk, finished now if idle time has not built it yet."""
+        while not self.ready:
+            next(self.work)
+        return self.ready.popleft()
+
+class World:
+    """Complete game state plus the step function that advances it.
+
+    ``events`` holds the beep/burst/restart tuples of the last step.
+    ``stress`` keeps that many obstacles on the field and makes hits
+    non-fatal. ``prebuild()`` generates level ahead during idle time.
+    """
+    def __init__(self, width, height, seed=None, stress=0):
+        self.width, self.height = width, height
+        self.ground_y = int(height * 0.8)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.best = 0.0
+        self.events = []
+        self.max_obstacle_w = 0
+        self.stress = stress
+        self.next_level = None
+        self.timer = None
+        self.player = Player(width, height)
+        self.obstacle_pool = Pool(Obstacle)
+        self.pickup_pool = Pool(Pickup)
+        self.obstacles = self.obstacle_pool.active
+        self.pickups = self.pickup_pool.active
+        self.reset()
+    def reset(self):
+        self.player.reset(self.width, self.height)
+        self.obstacle_pool.release_all()
+        self.pickup_pool.release_all()
+        self.time = 0.0
+        self.score = 0.0
+        self.speed = 240.0
+        self.level = self.next_level or LevelGenerator(self.rng.getrandbits(32), self.width, self.height)
+        self.next_level = LevelGenerator(self.rng.getrandbits(32), self.width, self.height)
+        self.due = []               # pending spawns of the current chunk, latest first
+        self.shake = 0.0
+        self.paused = False
+        self.game_over = False
+    @property
+    def difficulty(self):
+        return difficulty_at(self.time)
+
+    def step(self, inp, dt):
+        self.events.clear()
+        if not self.game_over and inp.pause_pressed:
+            self.paused = not self.paused
+        if self.game_over and inp.restart_pressed:
+            self.reset()
+            self.events.append(("restart",))
+        if self.paused or self.game_over:
+            return
+        self.time += dt
+        timer = self.timer
+        self._spawn(dt)
+        if timer: timer.lap("spawn")
+        self._update_entities(inp, dt)
+        if timer: timer.lap("entities")
+        self._collide(dt)
+        if timer: timer.lap("collide")
+        self.shake = max(0.0, self.shake - dt*20)
+
+    def _spawn(self, dt):
+        rng = self.rng
+        difficulty = self.difficulty
+        self.speed += dt * (10.0 + difficulty*6.0)
+        self.score += dt * (10.0 * difficulty) * (1 + 0.1*self.player.combo)
+
+        # Release everything the level has scheduled up to now
+        due, now, base_x = self.due, self.time, self.width + 30
+        while True:
+            while not due:
+                due.extend(reversed(self.level.next().spawns))
+            if due[-1][0] > now:
+                break
+            _, kind, dx, y, w, h, factor, phase = due.pop()
+            if kind in PICKUP_KINDS:
+                self.pickup_pool.spawn(kind, base_x + dx, y, self.speed*factor, phase)
+            else:
+                self.obstacle_pool.spawn(kind, base_x + dx, y, w, h, self.speed*factor, phase)
+                self.max_obstacle_w = max(self.max_obstacle_w, w)
+        # Stress mode keeps the field topped up with extra waves off to the right
+        while len(self.obstacles) < self.stress:
+            self._spawn_pattern(rng.choice(PATTERNS), self.width + 30 + rng.random()*self.width)
+
+    def prebuild(self, until):
+        """Generate level ahead until perf_counter ``until``: this run's coming chunks, then the next run's opening."""
+        if not self.game_over and not self.level.build(until):
+            return
+        self.next_level.build(until, ahead=1)
+
+    def _update_entities(self, inp, dt):
+        self.player.update(inp, dt, self.ground_y, self.events)
+        for ob in self.obstacles: ob.update(dt, self.time)
+        for pk in self.pickups: pk.update(dt, self.time)
+
+        self.obstacle_pool.compact()
+        self.pickup_pool.compact()
+
+    def _spawn_pattern(self, pattern, base_x):
+        speed = self.speed
+        for kind, dx, y, w, h, factor, phase in make_wave(self.rng, pattern, self.ground_y, self.height):
+            self.obstacle_pool.spawn(kind, base_x + dx, y, w, h, speed*factor, phase)
+            self.max_obstacle_w = max(self.max_obstacle_w, w)
+
+    def _collide(self, dt):
+        # Broad phase: everything scrolls left at near-uniform speed, so the
+        # entity lists stay almost sorted by x (the re-sort is ~linear) and
+        # only the slice that can reach the player's circle is tested.
+        player = self.player
+        px, py, r = player.x, player.y, player.r
+        hit_r2 = r * r
+        near_r2 = (r + NEAR_MISS) ** 2
+        pre_combo = player.combo
+        near_miss = False
+        obstacles = self.obstacles
+        obstacles.sort(key=_by_x)
+        lo = bisect_left(obstacles, px - r - NEAR_MISS - self.max_obstacle_w, key=_by_x)
+        hi = bisect_right(obstacles, px + r + NEAR_MISS, key=_by_x)
+        for i in range(lo, hi):
+            ob = obstacles[i]
+            # Hit test and near-miss distance share one closest-point query
+            dx = max(ob.x - px, 0, px - (ob.x + ob.w))
+            dy = max(ob.y - py, 0, py - (ob.y + ob.h))
+            d2 = dx*dx + dy*dy
+            if d2 <= hit_r2:
+                if player.shield > 0 or self.stress:
+                    player.shield = 0.0
+                    self.shake = 10
+                    self.events.append(("beep", 180, 60, 0.25))
+                    self.events.append(("burst", px, py, "shield"))
+                    ob.alive = False
+                else:
+                    self.game_over = True
+                    self.best = max(self.best, self.score)
+                    self.events.append(("beep", 120, 150, 0.35))
+                    break
+            elif d2 < near_r2:
+                near_miss = True
+        if near_miss:
+            if player.combo_time > 0:
+                player.combo_charge += dt * TUNED_HZ
+                gained = int(player.combo_charge + 1e-6)   # dt from a log is rounded to whole µs
+                player.combo = min(20, player.combo + gained)
+                player.combo_charge -= gained
+            else:
+                player.combo, player.combo_charge = 1, 0.0
+            player.combo_time = 1.2
+            if player.combo != pre_combo:
+                self.events.append(("beep", 840, 40, 0.18))
+
+        pickups = self.pickups
+        pickups.sort(key=_by_x)
+        lo = bisect_left(pickups, px - r - Pickup.R, key=_by_x)
+        hi = bisect_right(pickups, px + r + Pickup.R, key=_by_x)
+        for i in range(lo, hi):
+            pk = pickups[i]
+            if aabb_circle_collision(pk.rect(), px, py, r):
+                pk.alive = False
+                if pk.kind == "shield":
+                    player.shield = 6.0
+                    self.events.append(("beep", 500, 80, 0.25))
+                elif pk.kind == "slow":
+                    player.slowmo = 2.1
+                    self.events.append(("beep", 300, 80, 0.25))
+                else:
+                    self.score += 80 + 10*player.combo
+                    self.events.append(("beep", 760, 60, 0.25))
+                    self.events.append(("burst", pk.x, pk.y, "score"))
+
+def autopilot(world, controls):
+    """Minimal scripted policy: hop ground hazards, fast-fall under airborne ones."""
+    p = world.player
+    controls.clear_edges()
+    ground_hazard = air_hazard = False
+    reach = world.speed * 0.32
+    for ob in world.obstacles:
+        gap = ob.x - (p.x + p.r)
+        if gap < -ob.w - p.r or gap > reach:
+            continue
+        swing = 30 if ob.kind == "laser" else (50 if ob.kind == "spikeball" else 0)
+        if ob.y + ob.h + swing >= world.ground_y - 2*p.r - 4 and ob.kind == "block":
+            ground_hazard = True
+        elif gap < reach * 0.6:
+            air_hazard = True
+    if ground_hazard and p.on_ground and not controls.jump:
+        controls.press_jump()
+    elif not ground_hazard or p.on_ground:
+        controls.release_jump()
+    controls.down = air_hazard and not ground_hazard
+
+def run(world, seconds, dt=SIM_DT, policy=autopilot):
+    """Step ``world`` through ``seconds`` of simulated time, restarting on death.
+
+    Returns ``(steps, deaths)``.
+    """
+    controls = Controls()
+    steps = deaths = 0
+    for _ in range(int(seconds / dt)):
+        if policy is not None:
+            policy(world, controls)
+        controls.restart_pressed = world.game_over
+        world.step(controls, dt)
+        if world.game_over and not controls.restart_pressed:
+            deaths += 1
+        steps += 1
+    return steps, deaths
+
+# Input logs: one byte of Controls flags and a uint16 dt (microseconds) per
+# step, zlib-compressed behind a fixed header, plus a state digest every
+# CHECK_EVERY steps so a replay can report the first step that diverged.
+LOG_FLAGS = ("left", "right", "down", "jump", "jump_pressed", "jump_released",
+             "pause_pressed", "restart_pressed")
+LOG_HEADER = struct.Struct("<4sBqHHHIHI")  # magic, version, seed, w, h, stress, steps, check_every, final digest
+
+def state_digest(world):
+    """CRC32 of the gameplay state, for comparing a replay with its recording."""
+    p = world.player
+    h = zlib.crc32(struct.pack("<5d6dI??", world.time, world.score, world.speed, world.best,
+                               world.shake, p.x, p.y, p.vx, p.vy, p.shield, p.slowmo,
+                               p.combo, world.paused, world.game_over))
+    for ob in world.obstacles:
+        h = zlib.crc32(struct.pack("<2d", ob.x, ob.y), h)
+    for pk in world.pickups:
+        h = zlib.crc32(struct.pack("<2d", pk.x, pk.y), h)
+    return h
+
+class InputLog:
+    """Bit-packed per-step record of the Controls and dt a World was stepped with.
+
+    ``record`` quantizes dt to whole microseconds and returns the value the
+    caller must step with, so recording and replay see identical floats.
+    """
+    MAGIC = b"NDRP"
+    VERSION = 2              # bumped whenever the rules change, so stale logs are refused
+    CHECK_EVERY = 120
+
+    def __init__(self, seed, width, height, stress=0):
+        self.seed, self.width, self.height, self.stress = seed, width, height, stress
+        self.flags = bytearray()
+        self.dts = array("H")
+        self.checks = array("I")
+        self.final = 0
+
+    def __len__(self):
+        return len(self.flags)
+
+    def record(self, controls, dt):
+        bits = 0
+        for i, name in enumerate(LOG_FLAGS):
+            if getattr(controls, name):
+                bits |= 1 << i
+        self.flags.append(bits)
+        us = max(1, min(65535, round(dt * 1e6)))
+        self.dts.append(us)
+        return us / 1e6
+
+    def checkpoint(self, world):
+        """Call after each recorded step."""
+        if len(self.flags) % self.CHECK_EVERY == 0:
+            self.checks.append(state_digest(world))
+
+    def apply(self, i, controls):
+        """Load step ``i`` into ``controls``; returns its dt."""
+        bits = self.flags[i]
+        for j, name in enumerate(LOG_FLAGS):
+            setattr(controls, name, bool(bits >> j & 1))
+        return self.dts[i] / 1e6
+
+    def verify(self, i, world):
+        """False if step ``i`` ends on a checkpoint that ``world`` does not match."""
+        n = i + 1
+        if n == len(self.flags):
+            return state_digest(world) == self.final
+        if n % self.CHECK_EVERY or n // self.CHECK_EVERY > len(self.checks):
+            return True
+        return state_digest(world) == self.checks[n // self.CHECK_EVERY - 1]
+
+    def world(self):
+        return World(self.width, self.height, seed=self.seed, stress=self.stress)
+
+    def save(self, path, world):
+        """Write the log; ``world`` is the recorded World, digested as the final state."""
+        self.final = state_digest(world)
+        dts, checks = array("H", self.dts), array("I", self.checks)
+        if sys.byteorder == "big":
+            dts.byteswap(); checks.byteswap()
+        with open(path, "wb") as f:
+            f.write(LOG_HEADER.pack(self.MAGIC, self.VERSION, self.seed, self.width, self.height,
+                                    self.stress, len(self.flags), self.CHECK_EVERY, self.final))
+            f.write(zlib.compress(bytes(self.flags) + dts.tobytes() + checks.tobytes(), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, w, h, stress, n, every, final = LOG_HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path}: not a version {cls.VERSION} Neon Dash input log")
+        body = zlib.decompress(data[LOG_HEADER.size:])
+        log = cls(seed, w, h, stress)
+        log.CHECK_EVERY, log.final = every, final
+        log.flags = bytearray(body[:n])
+        log.dts.frombytes(body[n:3*n])
+        log.checks.frombytes(body[3*n:])
+        if sys.byteorder == "big":
+            log.dts.byteswap(); log.checks.byteswap()
+        return log
+
+def replay(log, world=None):
+    """Step a fresh World through ``log`` as fast as possible.
+
+    Returns ``(world, diverged)`` where ``diverged`` is the first step whose
+    checkpoint digest differs from the recording, or None if the run matched.
+    """
+    world = world or log.world()
+    controls = Controls()
+    diverged = None
+    for i in range(len(log)):
+        world.step(controls, log.apply(i, controls))
+        if diverged is None and not log.verify(i, world):
+            diverged = i
+    return world, diverged
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Run Neon Dash headless.")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--seconds", type=float, default=300.0)
+    ap.add_argument("--dt", type=float, default=SIM_DT)
+    ap.add_argument("--size", default="1920x1080")
+    ap.add_argument("--stress", type=int, default=0, metavar="N",
+                    help="keep N obstacles on the field (hits never end the run)")
+    ap.add_argument("--replay", metavar="LOG", help="replay an input log and verify it")
+    args = ap.parse_args()
+    if args.replay:
+        log = InputLog.load(args.replay)
+        t = time.perf_counter()
+        world, diverged = replay(log)
+        wall = time.perf_counter() - t
+        print(f"replay seed={log.seed} steps={len(log)} sim={world.time:.2f}s score={int(world.score)} "
+              f"best={int(world.best)} wall={wall:.3f}s "
+              + ("OK" if diverged is None else f"DIVERGED at step {diverged}"))
+        sys.exit(diverged is not None)
+    w, h = (int(v) for v in args.size.split("x"))
+    world = World(w, h, seed=args.seed, stress=args.stress)
+    t = time.perf_counter()
+    steps, deaths = run(world, args.seconds, args.dt)
+    wall = time.perf_counter() - t
+    print(f"seed={args.seed} sim={args.seconds:.0f}s steps={steps} deaths={deaths} "
+          f"best={int(world.best)} wall={wall:.3f}s ({steps/max(wall, 1e-9):.0f} steps/s)")